@@ -1,34 +1,77 @@
+import os
+import tempfile
+import time
+from functools import lru_cache
+
+import numpy as np
+
 upper_alphabet = 'АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ'
 lower_alphabet = 'абвгдеёжзийклмнопрстуфхцчшщъыьэюя'
 alphabet_size = len(upper_alphabet)
 
+# Частоты букв русского языка (%), в порядке алфавита
+russian_frequencies = [
+    8.01, 1.59, 4.54, 1.70, 2.98, 8.45, 0.04, 0.94, 1.65, 7.35, 1.21,
+    3.49, 4.40, 3.21, 6.70, 10.97, 2.81, 4.73, 5.47, 6.26, 2.62, 0.26,
+    0.97, 0.48, 1.44, 0.73, 0.36, 0.04, 1.90, 1.74, 0.32, 0.64, 2.01,
+]
+
+
+# Таблица перевода для str.translate: строится один раз на каждый из 33 сдвигов
+@lru_cache(maxsize=None)
+def _caesar_table(shift):
+    rotated_upper = upper_alphabet[shift:] + upper_alphabet[:shift]
+    rotated_lower = lower_alphabet[shift:] + lower_alphabet[:shift]
+    return str.maketrans(upper_alphabet + lower_alphabet, rotated_upper + rotated_lower)
+
+
+class CaesarCipher:
+    def __init__(self, shift):
+        self.shift = shift % alphabet_size
+        self._encrypt_table = _caesar_table(self.shift)
+        self._decrypt_table = _caesar_table(-self.shift % alphabet_size)
+
+    def encrypt(self, text):
+        return text.translate(self._encrypt_table)
+
+    def decrypt(self, ciphertext):
+        return ciphertext.translate(self._decrypt_table)
+
+    # Потоковый режим: шифр посимвольный, поэтому куски обрабатываются независимо
+    def encrypt_stream(self, chunks):
+        table = self._encrypt_table
+        for chunk in chunks:
+            yield chunk.translate(table)
+
+    def decrypt_stream(self, chunks):
+        table = self._decrypt_table
+        for chunk in chunks:
+            yield chunk.translate(table)
+
+    def encrypt_file(self, src_path, dst_path, chunk_size=1 << 20):
+        return _translate_file(src_path, dst_path, self.encrypt_stream, chunk_size)
+
+    def decrypt_file(self, src_path, dst_path, chunk_size=1 << 20):
+        return _translate_file(src_path, dst_path, self.decrypt_stream, chunk_size)
+
+
+# Чтение файла кусками по chunk_size символов (память постоянна), возвращает число записанных байт
+def _translate_file(src_path, dst_path, stream, chunk_size):
+    written = 0
+    with open(src_path, encoding='utf-8', newline='') as src, \
+            open(dst_path, 'w', encoding='utf-8', newline='') as dst:
+        chunks = iter(lambda: src.read(chunk_size), '')
+        for chunk in stream(chunks):
+            dst.write(chunk)
+            written += len(chunk.encode('utf-8'))
+    return written
+
+
 def caesar_encrypt(text, shift):
-    result = ''
-    shift = shift % alphabet_size
-    for char in text:
-        if char in upper_alphabet:
-            index = (upper_alphabet.index(char) + shift) % alphabet_size
-            result += upper_alphabet[index]
-        elif char in lower_alphabet:
-            index = (lower_alphabet.index(char) + shift) % alphabet_size
-            result += lower_alphabet[index]
-        else:
-            result += char
-    return result
+    return CaesarCipher(shift).encrypt(text)
 
 def caesar_decrypt(ciphertext, shift):
-    result = ''
-    shift = shift % alphabet_size
-    for char in ciphertext:
-        if char in upper_alphabet:
-            index = (upper_alphabet.index(char) - shift) % alphabet_size
-            result += upper_alphabet[index]
-        elif char in lower_alphabet:
-            index = (lower_alphabet.index(char) - shift) % alphabet_size
-            result += lower_alphabet[index]
-        else:
-            result += char
-    return result
+    return CaesarCipher(shift).decrypt(ciphertext)
 
 
 # Все варианты
@@ -40,6 +83,66 @@ def caesar_brute_force(ciphertext):
     return results
 
 
+# Замер пропускной способности файлового режима (МБ/с)
+def benchmark_caesar(size_mb=8, shift=4):
+    sample = "А знаете, какая фраза часто повторялась в немецких шифровках ВМВ?\n"
+    repeat = size_mb * (1 << 20) // len(sample.encode('utf-8')) + 1
+    # Файлы во временном каталоге: удаляются и при ошибке, текущий каталог не трогается
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'caesar_bench.txt')
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(sample * repeat)
+        cipher = CaesarCipher(shift)
+        start = time.perf_counter()
+        written = cipher.encrypt_file(path, path + '.enc')
+        elapsed = time.perf_counter() - start
+    return written / (1 << 20) / elapsed
+
+
+# ---------- Ранжированный перебор по частотам ----------
+
+_log_profile = np.log(np.array(russian_frequencies) / sum(russian_frequencies))
+# Матрица оценок: score[s] = sum_j hist[j] * log p[(j - s) % 33] -- все 33 сдвига одним умножением
+_shift_score_matrix = _log_profile[(np.arange(alphabet_size)[:, None] - np.arange(alphabet_size)[None, :]) % alphabet_size]
+
+# Индекс буквы по коду символа; всё, что не буква алфавита, получает индекс alphabet_size
+_code_limit = max(map(ord, upper_alphabet + lower_alphabet)) + 1
+_code_to_index = np.full(_code_limit + 1, alphabet_size, dtype=np.intp)
+_code_to_index[[ord(c) for c in upper_alphabet]] = np.arange(alphabet_size)
+_code_to_index[[ord(c) for c in lower_alphabet]] = np.arange(alphabet_size)
+
+
+def text_to_indices(text):
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    return _code_to_index[np.minimum(codes, _code_limit)]
+
+
+def letter_histogram(text):
+    return np.bincount(text_to_indices(text), minlength=alphabet_size + 1)[:alphabet_size]
+
+
+# Оценки всех сдвигов без расшифрования кандидатов; список (сдвиг, оценка) от лучшего к худшему
+def caesar_rank_shifts(ciphertext):
+    scores = letter_histogram(ciphertext) @ _shift_score_matrix
+    order = np.argsort(-scores, kind='stable')
+    return [(int(shift), float(scores[shift])) for shift in order]
+
+
+# Пакетный взлом: одна гистограмма на текст через общий bincount, возвращает [(сдвиг, открытый текст)]
+def caesar_crack_batch(ciphertexts):
+    ciphertexts = list(ciphertexts)
+    if not ciphertexts:
+        return []
+    lengths = np.fromiter((len(c) for c in ciphertexts), dtype=np.intp, count=len(ciphertexts))
+    indices = text_to_indices(''.join(ciphertexts))
+    owners = np.repeat(np.arange(len(ciphertexts)), lengths)
+    width = alphabet_size + 1
+    hists = np.bincount(owners * width + indices, minlength=len(ciphertexts) * width)
+    hists = hists.reshape(len(ciphertexts), width)[:, :alphabet_size]
+    best = np.argmax(hists @ _shift_score_matrix, axis=1)
+    return [(int(shift), caesar_decrypt(c, int(shift))) for shift, c in zip(best, ciphertexts)]
+
+
 if __name__ == "__main__":
     original = "А знаете, какая фраза часто повторялась в немецких шифровках ВМВ, что позволяла взломать шифры?"
     shift = 4
@@ -49,4 +152,7 @@ if __name__ == "__main__":
     print(f"Расшифровано: {decrypted}")
     print("Варианты дешифрования перебором:")
     for variant in caesar_brute_force(encrypted):
-        print(variant)
\ No newline at end of file
+        print(variant)
+    best_shift, best_score = caesar_rank_shifts(encrypted)[0]
+    print(f"Наиболее вероятный сдвиг: {best_shift} (оценка {best_score:.1f})")
+    print(f"Файловый режим: {benchmark_caesar():.1f} МБ/с")
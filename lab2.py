@@ -1,8 +1,19 @@
+import time
+
+import numpy as np
+
 # Алфавит: русский алфавит из 33 букв (верхний и нижний регистр)
 upper_alphabet = 'АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ'
 lower_alphabet = 'абвгдеёжзийклмнопрстуфхцчшщъыьэюя'
 alphabet_size = len(upper_alphabet)
 
+# Частоты букв русского языка (%), в порядке алфавита
+russian_frequencies = [
+    8.01, 1.59, 4.54, 1.70, 2.98, 8.45, 0.04, 0.94, 1.65, 7.35, 1.21,
+    3.49, 4.40, 3.21, 6.70, 10.97, 2.81, 4.73, 5.47, 6.26, 2.62, 0.26,
+    0.97, 0.48, 1.44, 0.73, 0.36, 0.04, 1.90, 1.74, 0.32, 0.64, 2.01,
+]
+
 
 def vigenere_encrypt(text, key):
     result = ''
@@ -59,6 +70,188 @@ def vigenere_decrypt(ciphertext, key):
     return result
 
 
+# ---------- Векторизованный движок ----------
+
+# Код символа -> индекс: 0..32 заглавные, 33..65 строчные, 66 -- не буква алфавита
+_code_limit = max(map(ord, upper_alphabet + lower_alphabet)) + 1
+_code_to_index = np.full(_code_limit + 1, 2 * alphabet_size, dtype=np.intp)
+_code_to_index[[ord(c) for c in upper_alphabet]] = np.arange(alphabet_size)
+_code_to_index[[ord(c) for c in lower_alphabet]] = np.arange(alphabet_size, 2 * alphabet_size)
+_index_to_code = np.array([ord(c) for c in upper_alphabet + lower_alphabet], dtype=np.uint32)
+
+
+def text_to_codes(text):
+    return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+
+
+def codes_to_text(codes):
+    return codes.astype(np.uint32, copy=False).tobytes().decode('utf-32-le')
+
+
+class VigenereCipher:
+    def __init__(self, key):
+        if not key:
+            raise ValueError("Key must not be empty")
+        self.key = key
+        # Как и в vigenere_encrypt: на первом символе ключа вне upper_alphabet key_index
+        # перестает расти, и все дальнейшие буквы текста остаются без изменений
+        shifts = []
+        for key_char in key:
+            if key_char not in upper_alphabet:
+                break
+            shifts.append(upper_alphabet.index(key_char))
+        self.key_shifts = np.array(shifts, dtype=np.intp)
+        self.stuck = len(shifts) < len(key)
+
+    # Гамма сдвигов для букв с порядковыми номерами letter_numbers (по ним же идет key_index)
+    def _key_stream(self, letter_numbers):
+        if not self.stuck:
+            return self.key_shifts[letter_numbers % len(self.key)]
+        stream = np.zeros(len(letter_numbers), dtype=np.intp)
+        active = letter_numbers < len(self.key_shifts)
+        stream[active] = self.key_shifts[letter_numbers[active]]
+        return stream
+
+    def _apply(self, codes, sign, key_offset=0):
+        indices = _code_to_index[np.minimum(codes, _code_limit)]
+        letters = indices < 2 * alphabet_size
+        letter_indices = indices[letters]
+        # Номер буквы = накопленное количество букв алфавита до нее
+        letter_numbers = np.cumsum(letters)[letters] - 1 + key_offset
+        case_base = np.where(letter_indices >= alphabet_size, alphabet_size, 0)
+        shifted = (letter_indices - case_base + sign * self._key_stream(letter_numbers)) % alphabet_size
+        result = codes.copy()
+        result[letters] = _index_to_code[shifted + case_base]
+        return result, len(letter_indices)
+
+    def encrypt(self, text):
+        return codes_to_text(self._apply(text_to_codes(text), 1)[0])
+
+    def decrypt(self, ciphertext):
+        return codes_to_text(self._apply(text_to_codes(ciphertext), -1)[0])
+
+    def stream(self, decrypt=False, state=None):
+        return VigenereStream(self, decrypt, state)
+
+
+# Потоковое шифрование: key_index переносится между вызовами update, результат совпадает с разовым
+class VigenereStream:
+    def __init__(self, cipher, decrypt=False, state=None):
+        self.cipher = cipher if isinstance(cipher, VigenereCipher) else VigenereCipher(cipher)
+        self.sign = -1 if decrypt else 1
+        self.key_offset = 0
+        if state is not None:
+            self.import_state(state)
+
+    def update(self, chunk):
+        result, letters = self.cipher._apply(text_to_codes(chunk), self.sign, self.key_offset)
+        self.key_offset += letters
+        return codes_to_text(result)
+
+    # Состояние -- число уже обработанных букв; ключ в него не входит
+    def export_state(self):
+        return {'key_offset': self.key_offset, 'decrypt': self.sign < 0}
+
+    def import_state(self, state):
+        if state['decrypt'] != (self.sign < 0):
+            raise ValueError("State belongs to a stream of the other direction")
+        self.key_offset = state['key_offset']
+
+    # Файл обрабатывается кусками по chunk_size символов; возвращает итоговое состояние
+    def process_file(self, src_path, dst_path, chunk_size=1 << 20):
+        with open(src_path, encoding='utf-8', newline='') as src, \
+                open(dst_path, 'w', encoding='utf-8', newline='') as dst:
+            for chunk in iter(lambda: src.read(chunk_size), ''):
+                dst.write(self.update(chunk))
+        return self.export_state()
+
+
+# ---------- Криптоанализ: восстановление ключа ----------
+
+_log_profile = np.log(np.array(russian_frequencies) / sum(russian_frequencies))
+# score[s] = sum_j hist[j] * log p[(j - s) % 33] -- оценки всех сдвигов столбца одним умножением
+_shift_score_matrix = _log_profile[(np.arange(alphabet_size)[:, None] - np.arange(alphabet_size)[None, :]) % alphabet_size]
+
+
+# Только буквы шифртекста, индексы 0..32 без учета регистра (ключ сдвигается лишь на буквах)
+def letter_indices(text):
+    indices = _code_to_index[np.minimum(text_to_codes(text), _code_limit)]
+    return indices[indices < 2 * alphabet_size] % alphabet_size
+
+
+# Гистограммы столбцов для длины ключа key_length за один bincount: форма (key_length, 33)
+def _column_histograms(letters, key_length):
+    columns = np.arange(len(letters)) % key_length
+    counts = np.bincount(columns * alphabet_size + letters, minlength=key_length * alphabet_size)
+    return counts.reshape(key_length, alphabet_size)
+
+
+# Средний индекс совпадений по столбцам для длин 1..max_length (индекс 0 не используется)
+def index_of_coincidence(letters, max_length):
+    scores = np.zeros(max_length + 1)
+    for key_length in range(1, max_length + 1):
+        hists = _column_histograms(letters, key_length)
+        sizes = hists.sum(axis=1)
+        valid = sizes > 1
+        if not valid.any():
+            break
+        pairs = (hists * (hists - 1)).sum(axis=1)
+        scores[key_length] = (pairs[valid] / (sizes[valid] * (sizes[valid] - 1))).mean()
+    return scores
+
+
+# Метод Касиски: сколько расстояний между повторами триграмм делится на каждую длину 1..max_length
+def kasiski_counts(letters, max_length):
+    counts = np.zeros(max_length + 1, dtype=np.int64)
+    if len(letters) < 4:
+        return counts
+    trigrams = (letters[:-2] * alphabet_size + letters[1:-1]) * alphabet_size + letters[2:]
+    order = np.argsort(trigrams, kind='stable')
+    repeats = trigrams[order[1:]] == trigrams[order[:-1]]
+    distances = (order[1:] - order[:-1])[repeats]
+    for key_length in range(1, max_length + 1):
+        counts[key_length] = np.count_nonzero(distances % key_length == 0)
+    return counts
+
+
+# Длина ключа: среди длин с IoC не ниже threshold от максимума берем ту, что лучше подтверждена Касиски
+def estimate_key_length(ciphertext, max_length=20, threshold=0.9):
+    letters = letter_indices(ciphertext)
+    ioc = index_of_coincidence(letters, max_length)
+    kasiski = kasiski_counts(letters, max_length)
+    # Индекс 0 не используется: оцениваются только длины 1..max_length
+    ioc, kasiski = ioc[1:], kasiski[1:]
+    if not len(ioc) or ioc.max() <= 0:
+        raise ValueError("Too few repeated letters in the ciphertext to estimate the key length")
+    candidates = np.flatnonzero(ioc >= threshold * ioc.max())
+    return int(candidates[np.argmax(kasiski[candidates])]) + 1
+
+
+def recover_key(ciphertext, max_length=20, key_length=None):
+    letters = letter_indices(ciphertext)
+    if key_length is None:
+        key_length = estimate_key_length(ciphertext, max_length)
+    if key_length < 1:
+        raise ValueError("Key length must be positive")
+    shifts = np.argmax(_column_histograms(letters, key_length) @ _shift_score_matrix, axis=1)
+    return ''.join(upper_alphabet[shift] for shift in shifts)
+
+
+# Сравнение посимвольной и векторизованной версий на тексте размером size_mb
+def benchmark_vigenere(size_mb=10, key="ЗАЦЕНЗУРЕНО"):
+    sample = "А знаете, какая фраза часто повторялась в немецких шифровках ВМВ?\n"
+    text = sample * (size_mb * (1 << 20) // len(sample.encode('utf-8')) + 1)
+    start = time.perf_counter()
+    expected = vigenere_encrypt(text, key)
+    loop_time = time.perf_counter() - start
+    start = time.perf_counter()
+    actual = VigenereCipher(key).encrypt(text)
+    vector_time = time.perf_counter() - start
+    if actual != expected:
+        raise AssertionError("Vectorized output differs from vigenere_encrypt")
+    return loop_time, vector_time
+
+
 if __name__ == "__main__":
     original = "А знаете, какая фраза часто повторялась в немецких шифровках ВМВ, что позволяла взломать шифры?"
     key = "ЗАЦЕНЗУРЕНО"
@@ -67,3 +260,10 @@ if __name__ == "__main__":
     # Расшифрование (верхний регистр)
     decrypted = vigenere_decrypt(encrypted, key)
     print(f"Расшифровано (верхний): {decrypted}")
+    loop_time, vector_time = benchmark_vigenere(size_mb=1)
+    print(f"Посимвольно: {loop_time:.2f} с, векторизованно: {vector_time:.3f} с "
+          f"(ускорение x{loop_time / vector_time:.0f})")
+    print(f"Восстановленный ключ: {recover_key(VigenereCipher(key).encrypt(original * 20))}")
+    stream = VigenereCipher(key).stream()
+    parts = [stream.update(original[i:i + 10]) for i in range(0, len(original), 10)]
+    print(f"Потоковое шифрование совпадает с разовым: {''.join(parts) == encrypted}")
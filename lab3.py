@@ -1,29 +1,38 @@
 import math
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import combinations
+
+import numpy as np
+
+from modular import batch_mod_inverse, mod_inverse
 
 # Модуль для арифметики классов вычетов
 class Residue:
+    __slots__ = ('value', 'mod')
+
     def __init__(self, value, mod):
         self.mod = mod
         self.value = value % mod
 
-    def __add__(self, other):
+    def _check(self, other):
         if not isinstance(other, Residue) or self.mod != other.mod:
             raise ValueError("Operands must be Residue with same mod")
-        return Residue((self.value + other.value) % self.mod, self.mod)
+
+    def __add__(self, other):
+        self._check(other)
+        return Residue(self.value + other.value, self.mod)
 
     def __sub__(self, other):
-        if not isinstance(other, Residue) or self.mod != other.mod:
-            raise ValueError("Operands must be Residue with same mod")
-        return Residue((self.value - other.value) % self.mod, self.mod)
+        self._check(other)
+        return Residue(self.value - other.value, self.mod)
 
     def __mul__(self, other):
-        if not isinstance(other, Residue) or self.mod != other.mod:
-            raise ValueError("Operands must be Residue with same mod")
-        return Residue((self.value * other.value) % self.mod, self.mod)
+        self._check(other)
+        return Residue(self.value * other.value, self.mod)
 
     def __truediv__(self, other):
-        if not isinstance(other, Residue) or self.mod != other.mod:
-            raise ValueError("Operands must be Residue with same mod")
+        self._check(other)
         return self * other.inverse()
 
     def inverse(self):
@@ -35,61 +44,234 @@ class Residue:
 
     def __repr__(self):
         return f"Residue({self.value}, {self.mod})"
-# Расширенный алгоритм Евклида (НОД и коэффиценты)
-def egcd(a, b):
-    if a == 0:
-        return b, 0, 1
-    gcd, x1, y1 = egcd(b % a, a)
-    x = y1 - (b // a) * x1
-    y = x1
-    return gcd, x, y
-
-def mod_inverse(a, m):
-    gcd, x, y = egcd(a, m)
-    if gcd != 1:
-        raise ValueError(f"No modular inverse for {a} mod {m}")
-    return x % m
-
-# Функции для шифрования и расшифрования (основная программа)
+
+
+# Вектор вычетов с общим модулем в массиве NumPy; второй операнд -- ResidueArray или Residue
+class ResidueArray:
+    __slots__ = ('values', 'mod')
+
+    def __init__(self, values, mod):
+        self.mod = mod
+        # int64 не переполняется при умножении, пока mod < 2^31
+        dtype = np.int64 if mod < 2 ** 31 else object
+        self.values = np.asarray(values, dtype=dtype) % mod
+
+    def _operand(self, other):
+        if not isinstance(other, (Residue, ResidueArray)) or self.mod != other.mod:
+            raise ValueError("Operands must be ResidueArray or Residue with same mod")
+        return other.values if isinstance(other, ResidueArray) else other.value
+
+    def __add__(self, other):
+        return ResidueArray(self.values + self._operand(other), self.mod)
+
+    def __sub__(self, other):
+        return ResidueArray(self.values - self._operand(other), self.mod)
+
+    def __mul__(self, other):
+        return ResidueArray(self.values * self._operand(other), self.mod)
+
+    def __truediv__(self, other):
+        self._operand(other)
+        return self * other.inverse()
+
+    # Обратные элементы для всего вектора: трюк Монтгомери по различным значениям
+    def inverse(self):
+        unique, positions = np.unique(self.values, return_inverse=True)
+        inverses = np.array(batch_mod_inverse([int(v) for v in unique], self.mod), dtype=self.values.dtype)
+        return ResidueArray(inverses[positions.reshape(-1)].reshape(self.values.shape), self.mod)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        return Residue(int(self.values[index]), self.mod)
+
+    def __repr__(self):
+        return f"ResidueArray({self.values.tolist()}, {self.mod})"
+
+
+# Таблица кодов символов -> индекс в алфавите строится один раз на алфавит.
+# Как и в char_to_index, элемент алфавита из нескольких символов не совпадает ни с одним
+# символом текста (но может появиться на выходе), при повторах побеждает последний
+@lru_cache(maxsize=64)
+def _alphabet_lookup(alphabet):
+    singles = [(ord(char), i) for i, char in enumerate(alphabet) if len(char) == 1]
+    lookup = np.full(max((code for code, _ in singles), default=0) + 2, -1, dtype=np.int64)
+    for code, i in singles:
+        lookup[code] = i
+    if all(len(char) == 1 for char in alphabet):
+        outputs = np.array([ord(char) for char in alphabet], dtype=np.uint32)
+    else:
+        outputs = np.array(alphabet, dtype=object)
+    return lookup, outputs
+
+# Индексы символов текста в алфавите (-1 для символов вне алфавита)
+def _text_to_indices(text, alphabet):
+    lookup, _ = _alphabet_lookup(tuple(alphabet))
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    return codes, lookup[np.minimum(codes, len(lookup) - 1)]
+
+def _replace_indices(codes, indices, mask, alphabet):
+    _, outputs = _alphabet_lookup(tuple(alphabet))
+    if outputs.dtype != object:
+        result = codes.copy()
+        result[mask] = outputs[indices]
+        return result.tobytes().decode('utf-32-le')
+    result = np.array(list(map(chr, codes.tolist())), dtype=object)
+    result[mask] = outputs[indices]
+    return ''.join(result.tolist())
+
+# Функции для шифрования и расшифрования (основная программа): все сообщение обрабатывается одним вектором
 def affine_encrypt(text, a, b, alphabet):
     N = len(alphabet)
     if math.gcd(a, N) != 1:
         raise ValueError(f"gcd({a}, {N}) != 1, invalid a")
-    result = ''
     mod = N
     A = Residue(a, mod)
     B = Residue(b, mod)
-    char_to_index = {char: i for i, char in enumerate(alphabet)}
-    for char in text.upper():
-        if char in char_to_index:
-            x = Residue(char_to_index[char], mod)
-            y = (A * x + B).value
-            result += alphabet[y]
-        else:
-            result += char
-    return result
+    codes, indices = _text_to_indices(text.upper(), alphabet)
+    mask = indices >= 0
+    X = ResidueArray(indices[mask], mod)
+    Y = X * A + B
+    return _replace_indices(codes, Y.values, mask, alphabet)
 
 def affine_decrypt(ciphertext, a, b, alphabet):
     N = len(alphabet)
     if math.gcd(a, N) != 1:
         raise ValueError(f"gcd({a}, {N}) != 1, invalid a")
-    result = ''
     mod = N
     A = Residue(a, mod)
     B = Residue(b, mod)
     A_inv = A.inverse()
-    char_to_index = {char: i for i, char in enumerate(alphabet)}
-    for char in ciphertext.upper():
-        if char in char_to_index:
-            y = Residue(char_to_index[char], mod)
-            x = (A_inv * (y - B)).value
-            result += alphabet[x]
-        else:
-            result += char
-    return result
+    codes, indices = _text_to_indices(ciphertext.upper(), alphabet)
+    mask = indices >= 0
+    Y = ResidueArray(indices[mask], mod)
+    X = (Y - B) * A_inv
+    return _replace_indices(codes, X.values, mask, alphabet)
+
+
+# Предварительно скомпилированный шифр: ключ проверяется один раз, таблицы замен строятся сразу
+class AffineCipher:
+    def __init__(self, a, b, alphabet):
+        N = len(alphabet)
+        if math.gcd(a, N) != 1:
+            raise ValueError(f"gcd({a}, {N}) != 1, invalid a")
+        self.a = a
+        self.b = b
+        self.alphabet = alphabet
+        A = Residue(a, N)
+        B = Residue(b, N)
+        X = ResidueArray(np.arange(N), N)
+        encrypted = (X * A + B).values
+        decrypted = ((X - B) * A.inverse()).values
+        # Повторы в алфавите разрешаются как в char_to_index: побеждает последний
+        self._encrypt_table = str.maketrans(
+            {char: alphabet[y] for char, y in zip(alphabet, encrypted) if len(char) == 1})
+        self._decrypt_table = str.maketrans(
+            {char: alphabet[x] for char, x in zip(alphabet, decrypted) if len(char) == 1})
+
+    def encrypt(self, text):
+        return text.upper().translate(self._encrypt_table)
+
+    def decrypt(self, ciphertext):
+        return ciphertext.upper().translate(self._decrypt_table)
+
+    def encrypt_many(self, texts):
+        table = self._encrypt_table
+        return [text.upper().translate(table) for text in texts]
+
+    def decrypt_many(self, ciphertexts):
+        table = self._decrypt_table
+        return [text.upper().translate(table) for text in ciphertexts]
 
 
 
+# ---------- Криптоанализ ----------
+
+# Частоты букв русского языка (%)
+russian_frequencies = {
+    'А': 8.01, 'Б': 1.59, 'В': 4.54, 'Г': 1.70, 'Д': 2.98, 'Е': 8.45, 'Ё': 0.04, 'Ж': 0.94,
+    'З': 1.65, 'И': 7.35, 'Й': 1.21, 'К': 3.49, 'Л': 4.40, 'М': 3.21, 'Н': 6.70, 'О': 10.97,
+    'П': 2.81, 'Р': 4.73, 'С': 5.47, 'Т': 6.26, 'У': 2.62, 'Ф': 0.26, 'Х': 0.97, 'Ц': 0.48,
+    'Ч': 1.44, 'Ш': 0.73, 'Щ': 0.36, 'Ъ': 0.04, 'Ы': 1.90, 'Ь': 1.74, 'Э': 0.32, 'Ю': 0.64,
+    'Я': 2.01,
+}
+
+# Все допустимые ключи: a взаимно просто с N, b -- любой вычет
+def affine_keys(alphabet):
+    N = len(alphabet)
+    return [(a, b) for a in range(1, N) if math.gcd(a, N) == 1 for b in range(N)]
+
+# Логарифмы частот в порядке алфавита; символам без частоты достается малая доля
+def _log_profile(alphabet, frequencies):
+    weights = np.array([frequencies.get(char, 0.0) for char in alphabet], dtype=float)
+    weights = np.maximum(weights, weights.sum() * 1e-4 + 1e-12)
+    return np.log(weights / weights.sum())
+
+def _histograms(texts, alphabet):
+    N = len(alphabet)
+    hists = np.zeros((len(texts), N), dtype=np.int64)
+    for row, text in enumerate(texts):
+        _, indices = _text_to_indices(text.upper(), alphabet)
+        hists[row] = np.bincount(indices[indices >= 0], minlength=N)
+    return hists
+
+# Оценки ключей с данными a для всех гистограмм сразу, без построения открытых текстов:
+# score[t, (a, b)] = sum_y hist[t, y] * log p[a^{-1} (y - b)]
+def _score_keys(a_values, hists, log_profile):
+    N = len(log_profile)
+    y = np.arange(N)
+    b = np.arange(N)
+    a_inv = np.array(batch_mod_inverse([int(a) for a in a_values], N), dtype=np.int64)
+    # decrypted[a, b, y] -> индекс открытого символа
+    decrypted = (a_inv[:, None, None] * (y[None, None, :] - b[None, :, None])) % N
+    table = log_profile[decrypted].reshape(-1, N).T
+    return hists @ table
+
+def _score_all_keys(hists, alphabet, frequencies, processes):
+    N = len(alphabet)
+    a_values = [a for a in range(1, N) if math.gcd(a, N) == 1]
+    log_profile = _log_profile(alphabet, frequencies)
+    # Пространство ключей делится по значениям a: куски ограничены по памяти и раздаются процессам
+    chunk_count = max(len(a_values) * N * N // (1 << 22) + 1, (processes or 1) * 4)
+    chunks = [chunk for chunk in np.array_split(a_values, chunk_count) if len(chunk)]
+    args = (chunks, [hists] * len(chunks), [log_profile] * len(chunks))
+    if not processes or processes < 2 or len(chunks) < 2:
+        scores = np.hstack(list(map(_score_keys, *args)))
+    else:
+        with ProcessPoolExecutor(processes) as pool:
+            scores = np.hstack(list(pool.map(_score_keys, *args)))
+    keys = [(a, b) for a in a_values for b in range(N)]
+    return scores, keys
+
+# Перебор всех ключей: top лучших (a, b, оценка) для одного шифртекста
+def affine_brute_force(ciphertext, alphabet, frequencies=russian_frequencies, top=10, processes=None):
+    scores, keys = _score_all_keys(_histograms([ciphertext], alphabet), alphabet, frequencies, processes)
+    order = np.argsort(-scores[0], kind='stable')[:top]
+    return [(keys[i][0], keys[i][1], float(scores[0, i])) for i in order]
+
+# Аудит пакета записей: наиболее вероятный ключ (a, b) для каждой
+def affine_crack_batch(ciphertexts, alphabet, frequencies=russian_frequencies, processes=None):
+    scores, keys = _score_all_keys(_histograms(list(ciphertexts), alphabet), alphabet, frequencies, processes)
+    return [keys[i] for i in np.argmax(scores, axis=1)] if len(scores) else []
+
+# Ключ по известным парам (открытый символ, шифрсимвол): y = a x + b (mod N).
+# Берется первая пара пар с обратимой разностью x1 - x2, ключ сверяется со всеми парами
+def affine_known_plaintext(pairs, alphabet):
+    N = len(alphabet)
+    char_to_index = {char: i for i, char in enumerate(alphabet)}
+    points = [(char_to_index[p], char_to_index[c]) for p, c in pairs]
+    for (x1, y1), (x2, y2) in combinations(points, 2):
+        if math.gcd(x1 - x2, N) == 1:
+            break
+    else:
+        raise ValueError(f"pairs do not determine the key: no two plaintext symbols differ by a unit mod {N}")
+    a = (y1 - y2) * mod_inverse(x1 - x2, N) % N
+    b = (y1 - a * x1) % N
+    if math.gcd(a, N) != 1 or any((a * x + b - y) % N for x, y in points):
+        raise ValueError("pairs are inconsistent with any valid affine key")
+    return a, b
+
 
 # Пример использования (выберу вариант 0)
 if __name__ == "__main__":
@@ -105,3 +287,8 @@ if __name__ == "__main__":
     print(f"Зашифровано (a={a}, b={b}): {encrypted}")
     decrypted = affine_decrypt(encrypted, a, b, alphabet)
     print(f"Расшифровано: {decrypted}")
+    cipher = AffineCipher(a, b, alphabet)
+    print(f"AffineCipher: {cipher.encrypt(original)} -> {cipher.decrypt(cipher.encrypt(original))}")
+    frequencies = dict(russian_frequencies, _=17.5)
+    print(f"Лучшие ключи перебором: {affine_brute_force(encrypted, alphabet, frequencies, top=3)}")
+    print(f"Ключ по известному тексту: {affine_known_plaintext([('Н', 'А'), ('Т', 'О')], alphabet)}")
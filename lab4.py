@@ -1,5 +1,8 @@
+import os
+import tempfile
+from functools import lru_cache
+
 import numpy as np
-import math
 
 # ------------- Алфавит и исходные данные -------------
 
@@ -25,40 +28,313 @@ def text_to_vectors(text, alphabet, block_size):
 def vectors_to_text(vectors, alphabet):
     return ''.join(''.join(alphabet[idx] for idx in vec) for vec in vectors)
 
+# --------------- Точное обращение по модулю -------------
+# Гаусс--Жордан над целыми, для составного n -- сборка по CRT
+
+def _int_dtype(n):
+    # Произведение двух вычетов должно помещаться в int64
+    return np.int64 if n < 2 ** 31 else object
+
+def _prime_power_factors(n):
+    factors = []
+    p = 2
+    while p * p <= n:
+        if n % p == 0:
+            q = 1
+            while n % p == 0:
+                n //= p
+                q *= p
+            factors.append((p, q))
+        p += 1
+    if n > 1:
+        factors.append((n, n))
+    return factors
+
+# Обращение по модулю q = p^k; опорный элемент -- любой, не делящийся на p (он обратим mod q)
+def _gauss_jordan_inv(A, p, q):
+    m = A.shape[0]
+    M = np.concatenate([A % q, np.eye(m, dtype=A.dtype)], axis=1)
+    for col in range(m):
+        candidates = np.flatnonzero(M[col:, col] % p != 0)
+        if len(candidates) == 0:
+            return None
+        pivot = col + int(candidates[0])
+        if pivot != col:
+            M[[col, pivot]] = M[[pivot, col]]
+        M[col] = M[col] * pow(int(M[col, col]), -1, q) % q
+        factors = M[:, col].copy()
+        factors[col] = 0
+        M = (M - factors[:, None] * M[col]) % q
+    return M[:, m:]
+
+# Обратная матрица mod n или None, если det(A) не взаимно прост с n
+def matrix_mod_inv_exact(A, n):
+    A = np.asarray(A).astype(_int_dtype(n)) % n
+    result = np.zeros_like(A)
+    for p, q in _prime_power_factors(n):
+        inv = _gauss_jordan_inv(A % q, p, q)
+        if inv is None:
+            return None
+        # Сборка по китайской теореме об остатках
+        rest = n // q
+        result = (result + inv * (rest * pow(rest, -1, q) % n)) % n
+    return result
+
 # --------------- Генерация обратимой матрицы -------------
 
+def _random_units(n, size):
+    # Случайные обратимые вычеты mod n, выбираются пакетно из кандидатов
+    units = np.empty(0, dtype=np.int64)
+    while len(units) < size:
+        candidates = np.random.randint(1, n, size=2 * size) if n > 1 else np.zeros(size, dtype=np.int64)
+        units = np.concatenate([units, candidates[np.gcd(candidates, n) == 1]])
+    return units[:size]
+
+# Обратная к унитреугольной нижней матрице прямой подстановкой
+def _unit_lower_inv(L, n):
+    m = L.shape[0]
+    X = np.eye(m, dtype=L.dtype)
+    for i in range(1, m):
+        X[i] = (X[i] - L[i, :i] @ X[:i]) % n
+    return X
+
+# A = P * L * D * U: перестановка, унитреугольные L, U и диагональ D из обратимых вычетов.
+# Матрица обратима по построению, обратная собирается из обратных множителей без повторов
+def random_invertible_matrix(n, m):
+    # Сумма m произведений вычетов должна помещаться в int64
+    dtype = np.int64 if n * n * m < 2 ** 63 else object
+    eye = np.eye(m, dtype=dtype)
+    L = np.tril(np.random.randint(0, n, size=(m, m)).astype(dtype), -1) + eye
+    U = np.triu(np.random.randint(0, n, size=(m, m)).astype(dtype), 1) + eye
+    D = _random_units(n, m).astype(dtype)
+    perm = np.random.permutation(m)
+    A = ((L * D % n) @ U % n)[perm]
+    L_inv = _unit_lower_inv(L, n)
+    U_inv = _unit_lower_inv(U.T, n).T
+    D_inv = np.array([pow(int(d), -1, n) for d in D], dtype=dtype) if n > 1 else D
+    A_inv = ((U_inv * D_inv % n) @ L_inv % n)[:, perm]
+    return A, A_inv
+
 def find_invertible_matrix(n, m):
-    while True:
-        A = np.random.randint(0, n, size=(m, m))
-        det = int(round(np.linalg.det(A)))
-        if math.gcd(det, n) == 1:
-            return A
+    return random_invertible_matrix(n, m)[0]
+
+# Постоянный кэш ключей (n, m) -> (A, A^{-1}) в файле .npz для повторного использования сервисами
+class HillKeyCache:
+    def __init__(self, path):
+        self.path = path
+        self._keys = {}
+        if os.path.exists(path):
+            with np.load(path) as data:
+                for name in data.files:
+                    if name.startswith('A_'):
+                        n, m = map(int, name[2:].split('_'))
+                        # В файле -- int64; для больших n арифметике нужен тот же dtype, что дает генератор
+                        dtype = np.int64 if n * n * m < 2 ** 63 else object
+                        self._keys[(n, m)] = (data[name].astype(dtype), data[f'inv_{n}_{m}'].astype(dtype))
+
+    def get(self, n, m):
+        # Элементы хранятся в int64 (np.savez без pickle), поэтому модуль ограничен 2^63
+        if n >= 2 ** 63:
+            raise ValueError("HillKeyCache stores int64 entries, n must be below 2^63")
+        if (n, m) not in self._keys:
+            self._keys[(n, m)] = random_invertible_matrix(n, m)
+            self.save()
+        return self._keys[(n, m)]
+
+    def save(self):
+        arrays = {}
+        for (n, m), (A, A_inv) in self._keys.items():
+            # Все элементы меньше n < 2^63: object-массивы приводятся к int64, чтобы не уходить в pickle
+            arrays[f'A_{n}_{m}'] = np.asarray(A, dtype=np.int64)
+            arrays[f'inv_{n}_{m}'] = np.asarray(A_inv, dtype=np.int64)
+        # Запись во временный файл рядом и атомарная замена: прерванная запись не портит кэш
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
 
 def matrix_mod_inv(A, n):
-    det = int(round(np.linalg.det(A)))
-    det_inv = pow(det, -1, n)
-    adj = np.round(det * np.linalg.inv(A)).astype(int) % n
-    return (det_inv * adj) % n
+    inv = matrix_mod_inv_exact(A, n)
+    if inv is None:
+        raise ValueError(f"Matrix is not invertible mod {n}")
+    return inv
 
 # ------------ Шифрование и расшифрование ------------
 
+# Обратный ключ кэшируется: один и тот же A не обращается повторно при каждом вызове
+@lru_cache(maxsize=128)
+def _cached_mod_inv(key_bytes, m, n):
+    A = np.frombuffer(key_bytes, dtype=np.int64).reshape(m, m)
+    inv = matrix_mod_inv(A, n).astype(np.int64)
+    inv.flags.writeable = False
+    return inv
+
+# Пакетный шифр: весь текст -- матрица (блоки, m), шифрование одним (X @ A + H) % N
+class HillCipher:
+    def __init__(self, A, H, alphabet, A_inv=None):
+        self.alphabet = alphabet
+        self.n = len(alphabet)
+        self.A = np.asarray(A, dtype=np.int64) % self.n
+        self.H = np.asarray(H, dtype=np.int64) % self.n
+        self.m = self.A.shape[0]
+        if A_inv is None:
+            A_inv = _cached_mod_inv(self.A.tobytes(), self.m, self.n)
+        self.A_inv = np.asarray(A_inv, dtype=np.int64) % self.n
+        # Индексы в файлах хранятся в наименьшем подходящем типе
+        self.dtype = np.uint8 if self.n <= 256 else np.uint16 if self.n <= 65536 else np.uint32
+        self._codes = np.array([ord(c) for c in alphabet], dtype=np.uint32)
+        self._lookup = np.full(int(self._codes.max()) + 2, -1, dtype=np.int64)
+        self._lookup[self._codes] = np.arange(self.n)
+
+    def text_to_indices(self, text):
+        codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+        indices = self._lookup[np.minimum(codes, len(self._lookup) - 1)]
+        if (indices < 0).any():
+            bad = chr(codes[np.argmax(indices < 0)])
+            raise ValueError(f"Symbol {bad!r} is not in alphabet")
+        return indices
+
+    def indices_to_text(self, indices):
+        return self._codes[indices].tobytes().decode('utf-32-le')
+
+    def _pad(self, indices):
+        pad_len = (-len(indices)) % self.m
+        return np.concatenate([indices, np.full(pad_len, self.n - 1, dtype=indices.dtype)])
+
+    def _transform(self, src, dst, forward, slab_blocks):
+        # Обработка слоями по slab_blocks блоков: память ограничена и для memmap-массивов
+        m = self.m
+        for start in range(0, len(src), slab_blocks * m):
+            X = np.asarray(src[start:start + slab_blocks * m], dtype=np.int64).reshape(-1, m)
+            if forward:
+                Y = (X @ self.A + self.H) % self.n
+            else:
+                Y = ((X - self.H) % self.n) @ self.A_inv % self.n
+            dst[start:start + X.size] = Y.reshape(-1)
+        return dst
+
+    def encrypt_indices(self, indices, out=None, slab_blocks=1 << 16):
+        if len(indices) % self.m:
+            indices = self._pad(np.asarray(indices))
+        if out is None:
+            out = np.empty(len(indices), dtype=np.int64)
+        return self._transform(indices, out, True, slab_blocks)
+
+    def decrypt_indices(self, indices, out=None, slab_blocks=1 << 16):
+        if len(indices) % self.m:
+            raise ValueError(f"Ciphertext length must be a multiple of {self.m}")
+        if out is None:
+            out = np.empty(len(indices), dtype=np.int64)
+        return self._transform(indices, out, False, slab_blocks)
+
+    def encrypt(self, text):
+        return self.indices_to_text(self.encrypt_indices(self.text_to_indices(text)))
+
+    def decrypt(self, ciphertext):
+        return self.indices_to_text(self.decrypt_indices(self.text_to_indices(ciphertext)))
+
+    # Файлы индексов (по одному элементу self.dtype на символ) отображаются в память
+    def encrypt_file(self, src_path, dst_path, slab_blocks=1 << 16):
+        size = os.path.getsize(src_path) // np.dtype(self.dtype).itemsize
+        if size == 0:
+            open(dst_path, 'wb').close()
+            return 0
+        src = np.memmap(src_path, dtype=self.dtype, mode='r')
+        total = size + (-size) % self.m
+        dst = np.memmap(dst_path, dtype=self.dtype, mode='w+', shape=(total,))
+        full = size - size % self.m
+        self._transform(src[:full], dst, True, slab_blocks)
+        if full < size:
+            dst[full:] = self.encrypt_indices(self._pad(np.asarray(src[full:])))
+        dst.flush()
+        return total
+
+    def decrypt_file(self, src_path, dst_path, slab_blocks=1 << 16):
+        size = os.path.getsize(src_path) // np.dtype(self.dtype).itemsize
+        if size % self.m:
+            raise ValueError(f"Ciphertext length must be a multiple of {self.m}")
+        if size == 0:
+            open(dst_path, 'wb').close()
+            return 0
+        src = np.memmap(src_path, dtype=self.dtype, mode='r')
+        dst = np.memmap(dst_path, dtype=self.dtype, mode='w+', shape=(size,))
+        self._transform(src, dst, False, slab_blocks)
+        dst.flush()
+        return size
+
 def hill_encrypt(text, A, H, alphabet):
-    padded_text = pad_text(text, A[0].shape[0], alphabet[-1])
-    vectors = text_to_vectors(padded_text, alphabet, A[0].shape[0])
-    encrypted_vecs = []
-    for X in vectors:
-        Y = (np.dot(X, A) + H) % N
-        encrypted_vecs.append(Y.astype(int).tolist())
-    return vectors_to_text(encrypted_vecs, alphabet)
+    return HillCipher(A, H, alphabet).encrypt(text)
 
 def hill_decrypt(ciphertext, A, H, alphabet):
-    vecs = text_to_vectors(ciphertext, alphabet, A[0].shape[0])
-    A_inv = matrix_mod_inv(A, N)
-    decrypted_vecs = []
-    for Y in vecs:
-        X = np.dot((np.array(Y) - H) % N, A_inv) % N
-        decrypted_vecs.append(np.round(X).astype(int).tolist())
-    return vectors_to_text(decrypted_vecs, alphabet)
+    return HillCipher(A, H, alphabet).decrypt(ciphertext)
+
+# ----------- Атака по известному открытому тексту ------------
+
+# Выбор строк V, образующих матрицу, обратимую mod p^k (то есть по простому p):
+# над полем F_p жадный выбор точен. Остатки всех кандидатов редуцируются
+# одной векторной операцией на шаг
+def _independent_rows(V, p):
+    m = V.shape[1]
+    R = V % p
+    chosen = []
+    for _ in range(m):
+        usable = R.any(axis=1)
+        if not usable.any():
+            return None
+        row = int(np.argmax(usable))
+        chosen.append(row)
+        col = int(np.argmax(R[row] != 0))
+        pivot = R[row] * pow(int(R[row, col]), -1, p) % p
+        R = (R - R[:, col:col + 1] * pivot) % p
+    return chosen
+
+# Решение dX A = dY по модулю q = p^k на m независимых mod p строках из растущего окна
+def _solve_prime_power(dX, dY, p, q):
+    window = 4 * dX.shape[1]
+    while True:
+        rows = _independent_rows(dX[:window], p)
+        if rows is not None:
+            return _gauss_jordan_inv(dX[rows] % q, p, q) @ (dY[rows] % q) % q
+        if window >= len(dX):
+            return None
+        window *= 2
+
+# Восстановление ключа (A, H) из блоков Y = X A + H: разности с первым блоком дают
+# систему (X_i - X_0) A = Y_i - Y_0. Для каждого множителя p^k модуля блоки выбираются
+# отдельно, решения собираются по CRT, как в matrix_mod_inv_exact
+def hill_known_plaintext(plaintext, ciphertext, alphabet, m):
+    n = len(alphabet)
+    cipher = HillCipher(np.eye(m, dtype=np.int64), np.zeros(m, dtype=np.int64), alphabet)
+    X = cipher.text_to_indices(plaintext)
+    Y = cipher.text_to_indices(ciphertext)
+    blocks = min(len(X), len(Y)) // m
+    X = X[:blocks * m].reshape(blocks, m)
+    Y = Y[:blocks * m].reshape(blocks, m)
+    if blocks < 2:
+        raise ValueError("Need at least m + 1 known blocks")
+    dX = (X[1:] - X[0]) % n
+    dY = (Y[1:] - Y[0]) % n
+    A = np.zeros((m, m), dtype=np.int64)
+    for p, q in _prime_power_factors(n):
+        A_q = _solve_prime_power(dX, dY, p, q)
+        if A_q is None:
+            raise ValueError(f"Known blocks do not contain m + 1 affinely independent blocks mod {q}")
+        rest = n // q
+        A = (A + A_q * (rest * pow(rest, -1, q) % n)) % n
+    H = (Y[0] - X[0] @ A) % n
+    return A, H
+
+# Проверка, что перехваченный поток зашифрован именно ключом (A, H)
+def hill_check_key(plaintext, ciphertext, A, H, alphabet):
+    cipher = HillCipher(A, H, alphabet)
+    X = cipher.text_to_indices(plaintext)
+    Y = cipher.text_to_indices(ciphertext)
+    length = min(len(X), len(Y)) // cipher.m * cipher.m
+    return bool((cipher.encrypt_indices(X[:length]) == Y[:length]).all())
 
 # ----------- Пример использования ------------------
 
@@ -67,7 +343,7 @@ if __name__ == "__main__":
     print(f"Оригинал: {text}")
 
     # Генерация ключей (матрица и вектор)
-    A = find_invertible_matrix(N, m)
+    A, A_inv = random_invertible_matrix(N, m)
     H = np.random.randint(0, N, size=m)
 
     print(f"Матрица A:\n{A}")
@@ -76,5 +352,8 @@ if __name__ == "__main__":
     encrypted = hill_encrypt(text, A, H, alphabet)
     print(f"Зашифровано: {encrypted}")
 
-    decrypted = hill_decrypt(encrypted, A, H, alphabet)
+    decrypted = HillCipher(A, H, alphabet, A_inv).decrypt(encrypted)
     print(f"Расшифровано: {decrypted}")
+
+    A_found, H_found = hill_known_plaintext(text * 3, hill_encrypt(text * 3, A, H, alphabet), alphabet, m)
+    print(f"Ключ по известному тексту совпал: {(A_found == A).all() and (H_found == H).all()}")
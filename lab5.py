@@ -1,4 +1,11 @@
+import os
 import random
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
 # Принцип работы
 # 1. Подготовить данные
 # Переводим их в 2-ую форму, склеиваем вместе (в данном случае, 16 + 16 бит)
@@ -12,19 +19,19 @@ import random
 # Все то же самое, но наоборот
 
 # Перестановка элементов списка 64 раза
-def random_permutation(lst):
+def random_permutation(lst, rng=random):
     lst = lst[:]
     for _ in range(64):
-        i = random.randint(0, len(lst) - 1)
-        j = random.randint(0, len(lst) - 1)
+        i = rng.randint(0, len(lst) - 1)
+        j = rng.randint(0, len(lst) - 1)
         lst[i], lst[j] = lst[j], lst[i]
     return lst
 
 # Возвращает набор случайных перестановок
-def generate_permutations(original, n):
+def generate_permutations(original, n, rng=random):
     perms = []
     while len(perms) < n:
-        perm = random_permutation(original)
+        perm = random_permutation(original, rng)
         if perm != original:
             perms.append(perm)
     return perms
@@ -98,17 +105,401 @@ def bin_to_string(bit32):
     c2 = chr(bin_to_int(b2))
     return c1 + c2
 
+# ---------- Целочисленный движок ----------
+# Блок -- int, бит 31 соответствует позиции 0 битовой строки
+
+# P-блок четырьмя таблицами по 256 значений: для каждого входного байта -- готовые выходные биты
+def _make_p_tables(perm):
+    width = len(perm)
+    values = np.arange(256, dtype=np.uint32)
+    tables = np.zeros((width // 8, 256), dtype=np.uint32)
+    for i, p in enumerate(perm):
+        tables[p // 8] |= ((values >> (7 - p % 8)) & 1) << (width - 1 - i)
+    return tables
+
+# S-блок на байт: обе тетрады заменяются одной выборкой
+def _make_s_table(s_perm):
+    return np.array([(s_perm[value >> 4] << 4) | s_perm[value & 15] for value in range(256)], dtype=np.uint32)
+
+# Таблицы для произвольных перестановок -- через ограниченный кэш; для перестановок из банка
+# таблицы хранит сам банк (PermutationBank.p_tables/s_table)
+_p_tables = lru_cache(maxsize=128)(_make_p_tables)
+_s_table = lru_cache(maxsize=128)(_make_s_table)
+
+# (p, p_inv, s, s_inv) для пары перестановок, не взятых из банка
+def _key_tables(p_perm, s_perm):
+    return (_p_tables(p_perm), _p_tables(tuple(get_inverse_perm(p_perm))),
+            _s_table(s_perm), _s_table(tuple(get_inverse_perm(s_perm))))
+
+
+class SPNCipher:
+    # tables -- готовые (p, p_inv, s, s_inv); без них строятся по перестановкам один раз на ключ
+    def __init__(self, p_perm, s_perm, tables=None):
+        p_perm = tuple(p_perm)
+        s_perm = tuple(s_perm)
+        self.p_perm = p_perm
+        self.s_perm = s_perm
+        p, p_inv, s, s_inv = tables or _key_tables(p_perm, s_perm)
+        self._p = p.tolist()
+        self._p_inv = p_inv.tolist()
+        self._s = s.tolist()
+        self._s_inv = s_inv.tolist()
+        # S-блок побайтный, а P линеен по OR байтов, поэтому S и следующий за ним P
+        # сливаются в одни таблицы: P(S(x)) = OR по байтам b_i таблиц p[i][s[b_i]]
+        self._ps = p[:, s].tolist()
+        self._ps_inv = p_inv[:, s_inv].tolist()
+
+    # Ключ по номерам из P_perms/S_perms банка: перестановки, обратные и таблицы берутся из банка
+    @classmethod
+    def from_indices(cls, p_num, s_num, bank=None):
+        bank = bank or default_bank
+        return cls(bank.P_perms[p_num], bank.S_perms[s_num], bank.key_tables(p_num, s_num))
+
+    @staticmethod
+    def _permute(x, tables):
+        t0, t1, t2, t3 = tables
+        return t0[x >> 24] | t1[(x >> 16) & 255] | t2[(x >> 8) & 255] | t3[x & 255]
+
+    @staticmethod
+    def _substitute(x, table):
+        return (table[x >> 24] << 24) | (table[(x >> 16) & 255] << 16) | (table[(x >> 8) & 255] << 8) | table[x & 255]
+
+    def p_encrypt(self, x):
+        return self._permute(x, self._p)
+
+    def p_decrypt(self, x):
+        return self._permute(x, self._p_inv)
+
+    def s_encrypt(self, x):
+        return self._substitute(x, self._s)
+
+    def s_decrypt(self, x):
+        return self._substitute(x, self._s_inv)
+
+    # P -> S -> P, как в примере ниже
+    def encrypt_block(self, x):
+        p0, p1, p2, p3 = self._p
+        ps0, ps1, ps2, ps3 = self._ps
+        x = p0[x >> 24] | p1[(x >> 16) & 255] | p2[(x >> 8) & 255] | p3[x & 255]
+        return ps0[x >> 24] | ps1[(x >> 16) & 255] | ps2[(x >> 8) & 255] | ps3[x & 255]
+
+    def decrypt_block(self, x):
+        p0, p1, p2, p3 = self._p_inv
+        ps0, ps1, ps2, ps3 = self._ps_inv
+        x = p0[x >> 24] | p1[(x >> 16) & 255] | p2[(x >> 8) & 255] | p3[x & 255]
+        return ps0[x >> 24] | ps1[(x >> 16) & 255] | ps2[(x >> 8) & 255] | ps3[x & 255]
+
+    # ---------- Режимы работы над байтами (блок -- 4 байта, big-endian) ----------
+
+    def encrypt_ecb(self, data):
+        encrypt = self.encrypt_block
+        return _pack_blocks([encrypt(x) for x in _unpack_blocks(pad_bytes(data))])
+
+    def decrypt_ecb(self, data):
+        decrypt = self.decrypt_block
+        return unpad_bytes(_pack_blocks([decrypt(x) for x in _unpack_blocks(data)]))
+
+    def encrypt_cbc(self, data, iv):
+        encrypt = self.encrypt_block
+        out = []
+        prev = iv
+        for x in _unpack_blocks(pad_bytes(data)):
+            prev = encrypt(x ^ prev)
+            out.append(prev)
+        return _pack_blocks(out)
+
+    def decrypt_cbc(self, data, iv):
+        decrypt = self.decrypt_block
+        blocks = _unpack_blocks(data)
+        out = [decrypt(y) ^ prev for y, prev in zip(blocks, [iv] + blocks[:-1])]
+        return unpad_bytes(_pack_blocks(out))
+
+    # Блок счетчика -- 32-битный counter + номер блока. Старшие 32 - counter_bits бит counter
+    # служат nonce и не меняются: серия, которая перенесла бы разряд в них или за 2^32, отклоняется
+    def keystream(self, counter, start_block, count, counter_bits=32):
+        _check_ctr_range(counter, start_block + count, counter_bits)
+        encrypt = self.encrypt_block
+        first = counter + start_block
+        return _pack_blocks([encrypt(x) for x in range(first, first + count)])
+
+    # CTR: шифрование и расшифрование совпадают; диапазоны счетчика раздаются процессам.
+    # По умолчанию кусков примерно вчетверо больше, чем процессов
+    def ctr(self, data, counter, processes=None, chunk_blocks=None, counter_bits=32):
+        blocks = (len(data) + 3) // 4
+        _check_ctr_range(counter, blocks, counter_bits)
+        if not processes or processes < 2:
+            return _ctr_xor(self.p_perm, self.s_perm, counter, 0, data)
+        if chunk_blocks is None:
+            chunk_blocks = max(1 << 12, -(-blocks // (4 * processes)))
+        if blocks <= chunk_blocks:
+            return _ctr_xor(self.p_perm, self.s_perm, counter, 0, data)
+        step = chunk_blocks * 4
+        starts = range(0, len(data), step)
+        with ProcessPoolExecutor(processes) as pool:
+            parts = pool.map(_ctr_xor, [self.p_perm] * len(starts), [self.s_perm] * len(starts),
+                             [counter] * len(starts), [start // 4 for start in starts],
+                             [data[start:start + step] for start in starts])
+            return b''.join(parts)
+
+# ---------- Векторный движок: массив uint32-блоков за один проход на стадию ----------
+
+class SPNBatch:
+    # rounds -- список пар (p_perm, s_perm); раунд r: S_r, затем P_r, перед первым раундом -- P_0.
+    # Один раунд совпадает с SPNCipher.encrypt_block: P -> S -> P
+    # tables -- готовые (p, p_inv, s, s_inv) на каждый раунд; без них строятся по перестановкам
+    def __init__(self, rounds, tables=None):
+        self.rounds = [(tuple(p), tuple(s)) for p, s in rounds]
+        if tables is None:
+            tables = [_key_tables(p, s) for p, s in self.rounds]
+        self._p, self._p_inv, self._s, self._s_inv = (list(column) for column in zip(*tables))
+
+    # Раунды по номерам из P_perms/S_perms банка: [(p_num, s_num), ...]; таблицы -- из банка
+    @classmethod
+    def from_indices(cls, round_keys, bank=None):
+        bank = bank or default_bank
+        return cls([(bank.P_perms[p_num], bank.S_perms[s_num]) for p_num, s_num in round_keys],
+                   [bank.key_tables(p_num, s_num) for p_num, s_num in round_keys])
+
+    @staticmethod
+    def _permute(x, tables):
+        return (tables[0][x >> 24] | tables[1][(x >> 16) & 255]
+                | tables[2][(x >> 8) & 255] | tables[3][x & 255])
+
+    # Замена побайтно: таблица на 256 значений заменяет обе тетрады байта одной выборкой
+    @staticmethod
+    def _substitute(x, table):
+        return ((table[x >> 24] << 24) | (table[(x >> 16) & 255] << 16)
+                | (table[(x >> 8) & 255] << 8) | table[x & 255])
+
+    def encrypt(self, blocks):
+        x = self._permute(np.asarray(blocks, dtype=np.uint32), self._p[0])
+        for p, s in zip(self._p, self._s):
+            x = self._permute(self._substitute(x, s), p)
+        return x
+
+    def decrypt(self, blocks):
+        x = np.asarray(blocks, dtype=np.uint32)
+        for p_inv, s_inv in zip(reversed(self._p_inv), reversed(self._s_inv)):
+            x = self._substitute(self._permute(x, p_inv), s_inv)
+        return self._permute(x, self._p_inv[0])
+
+
+# Счетчик CTR -- весь 32-битный блок
+CTR_COUNTER_LIMIT = 1 << 32
+
+def _check_ctr_range(counter, count, counter_bits):
+    if not 0 <= counter < CTR_COUNTER_LIMIT:
+        raise ValueError(f"CTR counter must be in [0, {CTR_COUNTER_LIMIT})")
+    if not 1 <= counter_bits <= 32:
+        raise ValueError("CTR counter_bits must be in [1, 32]")
+    # Граница, до которой меняются только младшие counter_bits бит
+    limit = ((counter >> counter_bits) + 1) << counter_bits
+    if count < 0 or counter + count > limit:
+        raise ValueError(f"CTR run of {count} blocks from counter {counter:#x} would wrap "
+                         f"past its {counter_bits}-bit counter field")
+
+
+# Дополнение до целого числа блоков по PKCS#7 (всегда хотя бы один байт)
+def pad_bytes(data, block_size=4):
+    pad_len = block_size - len(data) % block_size
+    return bytes(data) + bytes([pad_len]) * pad_len
+
+def unpad_bytes(data, block_size=4):
+    if not data or len(data) % block_size:
+        raise ValueError("Padded data length must be a positive multiple of the block size")
+    pad_len = data[-1]
+    if not 1 <= pad_len <= block_size or data[-pad_len:] != bytes([pad_len]) * pad_len:
+        raise ValueError("Invalid padding")
+    return data[:-pad_len]
+
+def _unpack_blocks(data):
+    if len(data) % 4:
+        raise ValueError("Data length must be a multiple of 4 bytes")
+    return list(struct.unpack(f'>{len(data) // 4}I', data))
+
+def _pack_blocks(blocks):
+    return struct.pack(f'>{len(blocks)}I', *blocks)
+
+# XOR куска данных с гаммой CTR начиная с блока start_block (выполняется и в дочерних процессах)
+def _ctr_xor(p_perm, s_perm, counter, start_block, data):
+    count = (len(data) + 3) // 4
+    stream = SPNCipher(p_perm, s_perm).keystream(counter, start_block, count)[:len(data)]
+    return (int.from_bytes(data, 'big') ^ int.from_bytes(stream, 'big')).to_bytes(len(data), 'big')
+
+
+def string_to_int(s):
+    return bin_to_int(string_to_bin(s))
+
+def int_to_string(x):
+    return chr(x >> 16) + chr(x & 0xFFFF)
+
+
 # Генерация перестановок
-random.seed("Black Magic")  # Для воспроизводимости
 S_original = list(range(16))
 P_original = list(range(32))
 num_perms = 32  # 10-20
-# Перестановочки
-S_perms = generate_permutations(S_original, num_perms)
-P_perms = generate_permutations(P_original, num_perms)
+
+
+# Банк перестановок: строится при первом обращении собственным генератором (глобальный random
+# не пересевается), хранит обратные перестановки и таблицы; в файл пишутся только перестановки
+# и обратные к ним, таблицы строятся по мере надобности
+class PermutationBank:
+    _MAGIC = b'SPNB'
+    _HEADER = struct.Struct('<4sHH')
+
+    def __init__(self, seed="Black Magic", count=num_perms):
+        self.seed = seed
+        self.count = count
+        self._P_perms = None
+        self._S_perms = None
+        self._P_inv = None
+        self._S_inv = None
+        self._p_table_cache = {}
+        self._s_table_cache = {}
+
+    def _generate(self):
+        rng = random.Random(self.seed)  # Для воспроизводимости
+        # Порядок как раньше: сначала S, затем P из одного потока
+        self._S_perms = generate_permutations(S_original, self.count, rng)
+        self._P_perms = generate_permutations(P_original, self.count, rng)
+        self._P_inv = [get_inverse_perm(perm) for perm in self._P_perms]
+        self._S_inv = [get_inverse_perm(perm) for perm in self._S_perms]
+
+    @property
+    def P_perms(self):
+        if self._P_perms is None:
+            self._generate()
+        return self._P_perms
+
+    @property
+    def S_perms(self):
+        if self._S_perms is None:
+            self._generate()
+        return self._S_perms
+
+    def p_inverse(self, num):
+        if self._P_inv is None:
+            self._generate()
+        return self._P_inv[num]
+
+    def s_inverse(self, num):
+        if self._S_inv is None:
+            self._generate()
+        return self._S_inv[num]
+
+    # Таблицы строятся при первом обращении и хранятся в банке; inverse -- для обратной перестановки
+    def p_tables(self, num, inverse=False):
+        tables = self._p_table_cache.get((num, inverse))
+        if tables is None:
+            perm = self.p_inverse(num) if inverse else self.P_perms[num]
+            tables = self._p_table_cache[(num, inverse)] = _make_p_tables(perm)
+        return tables
+
+    def s_table(self, num, inverse=False):
+        table = self._s_table_cache.get((num, inverse))
+        if table is None:
+            perm = self.s_inverse(num) if inverse else self.S_perms[num]
+            table = self._s_table_cache[(num, inverse)] = _make_s_table(perm)
+        return table
+
+    # (p, p_inv, s, s_inv) для SPNCipher и SPNBatch
+    def key_tables(self, p_num, s_num):
+        return (self.p_tables(p_num), self.p_tables(p_num, inverse=True),
+                self.s_table(s_num), self.s_table(s_num, inverse=True))
+
+    # Формат: заголовок, затем перестановки и обратные к ним (uint8)
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self._HEADER.pack(self._MAGIC, len(self.P_perms), len(self.S_perms)))
+            for perms in (self.P_perms, self.S_perms, self._P_inv, self._S_inv):
+                f.write(np.array(perms, dtype=np.uint8).tobytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, p_count, s_count = cls._HEADER.unpack_from(data)
+        if magic != cls._MAGIC:
+            raise ValueError("Not a permutation bank file")
+        # Банк всегда хранит поровну P- и S-перестановок (count)
+        if p_count != s_count:
+            raise ValueError(f"Permutation bank file has {p_count} P and {s_count} S permutations")
+        if len(data) != cls._HEADER.size + 2 * (p_count * 32 + s_count * 16):
+            raise ValueError("Permutation bank file is truncated or corrupted")
+        perms = np.frombuffer(data, dtype=np.uint8, offset=cls._HEADER.size)
+        P, S, P_inv, S_inv = np.split(perms, np.cumsum([p_count * 32, s_count * 16, p_count * 32]))
+        P, P_inv = P.reshape(p_count, 32), P_inv.reshape(p_count, 32)
+        S, S_inv = S.reshape(s_count, 16), S_inv.reshape(s_count, 16)
+        for perm, inverse in ((P, P_inv), (S, S_inv)):
+            width = perm.shape[1]
+            if (inverse >= width).any() or (np.take_along_axis(perm, inverse, axis=1) != np.arange(width)).any():
+                raise ValueError("Permutation bank file holds inconsistent inverse permutations")
+        bank = cls(count=p_count)
+        bank.seed = None
+        bank._P_perms, bank._S_perms = P.tolist(), S.tolist()
+        bank._P_inv, bank._S_inv = P_inv.tolist(), S_inv.tolist()
+        return bank
+
+
+default_bank = PermutationBank()
+
+
+# P_perms и S_perms модуля строятся лениво при первом обращении
+def __getattr__(name):
+    if name in ('P_perms', 'S_perms'):
+        return getattr(default_bank, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Для S можно добавить перестановку, которая соответствует какому-то примеру, но поскольку в документе не указана конкретная, используем сгенерированные
 
+# Сравнение строкового и целочисленного путей на count блоках (шифрование и расшифрование)
+def benchmark_spn(count=20000, p_num=20, s_num=2):
+    perm_p = default_bank.P_perms[p_num]
+    perm_s = default_bank.S_perms[s_num]
+    blocks = [random.getrandbits(32) for _ in range(count)]
+    start = time.perf_counter()
+    for x in blocks:
+        bits = p_block_encrypt(battery_encrypt(p_block_encrypt(int_to_bin(x, 32), perm_p), perm_s), perm_p)
+        p_block_decrypt(battery_decrypt(p_block_decrypt(bits, perm_p), perm_s), perm_p)
+    string_time = time.perf_counter() - start
+    cipher = SPNCipher(perm_p, perm_s)
+    start = time.perf_counter()
+    for x in blocks:
+        cipher.decrypt_block(cipher.encrypt_block(x))
+    int_time = time.perf_counter() - start
+    return string_time, int_time
+
+
+# Пропускная способность режимов (МБ/с) на size байтах
+def benchmark_modes(size=1 << 20, p_num=20, s_num=2, processes=None):
+    cipher = SPNCipher.from_indices(p_num, s_num)
+    data = os.urandom(size)
+    runs = {
+        'ECB': lambda: cipher.decrypt_ecb(cipher.encrypt_ecb(data)),
+        'CBC': lambda: cipher.decrypt_cbc(cipher.encrypt_cbc(data, 0x1234ABCD), 0x1234ABCD),
+        'CTR': lambda: cipher.ctr(cipher.ctr(data, 0x1234ABCD, processes), 0x1234ABCD, processes),
+    }
+    result = {}
+    for mode, run in runs.items():
+        start = time.perf_counter()
+        if run() != data:
+            raise AssertionError(f"{mode} round trip failed")
+        result[mode] = 2 * size / (1 << 20) / (time.perf_counter() - start)
+    return result
+
+
+# Зависимость пропускной способности (МБ/с) от числа раундов на count блоках
+def benchmark_rounds(max_rounds=8, count=1 << 20):
+    blocks = np.random.randint(0, 2 ** 32, size=count, dtype=np.uint32)
+    result = []
+    for rounds in range(1, max_rounds + 1):
+        batch = SPNBatch.from_indices([(r % default_bank.count, r % default_bank.count) for r in range(rounds)])
+        start = time.perf_counter()
+        batch.encrypt(blocks)
+        result.append((rounds, count * 4 / (1 << 20) / (time.perf_counter() - start)))
+    return result
+
+
 if __name__ == "__main__":
     # Пример использования с номерами перестановок
     message = "東方"
@@ -120,10 +511,10 @@ if __name__ == "__main__":
     print("Исходное сообщение:", message)
     bits = string_to_bin(message)
     print("Битовая форма исходного сообщения:", bits)
-    perm_p = P_perms[p_num]
+    perm_p = default_bank.P_perms[p_num]
     bits_p1 = p_block_encrypt(bits, perm_p)
     print("Зашифрованная p-блоком битовая форма:", bits_p1)
-    perm_s = S_perms[s_num]
+    perm_s = default_bank.S_perms[s_num]
     bits_s = battery_encrypt(bits_p1, perm_s)
     print("Зашифрованная батареей s-блоков битовая форма:", bits_s)
     bits_p2 = p_block_encrypt(bits_s, perm_p)
@@ -141,4 +532,13 @@ if __name__ == "__main__":
     bits_dp2 = p_block_decrypt(bits_ds, perm_p)
     print("Расшифрованная p-блоком битовая форма:", bits_dp2)
     decrypted = bin_to_string(bits_dp2)
-    print("Расшифрованное сообщение:", decrypted)
\ No newline at end of file
+    print("Расшифрованное сообщение:", decrypted)
+
+    cipher = SPNCipher(perm_p, perm_s)
+    print("Целочисленный движок совпадает:", int_to_string(cipher.encrypt_block(string_to_int(message))) == encrypted)
+    string_time, int_time = benchmark_spn()
+    print(f"Строки: {string_time:.3f} с, целые: {int_time:.4f} с (ускорение x{string_time / int_time:.0f})")
+    for mode, speed in benchmark_modes(1 << 18).items():
+        print(f"{mode}: {speed:.2f} МБ/с")
+    for rounds, speed in benchmark_rounds(4):
+        print(f"NumPy, раундов {rounds}: {speed:.1f} МБ/с")
@@ -1,9 +1,98 @@
+import bisect
+import os
 import random
+import struct
+import time
+
+
+# Размер куска для XOR: временные целые и bytes не больше куска, независимо от длины сообщения
+_XOR_CHUNK = 1 << 20
+
+
+def _xor_bytes(a, b):
+    # Побайтовый XOR двух буферов одной длины за одну операцию над целыми
+    return (int.from_bytes(a, 'little') ^ int.from_bytes(b, 'little')).to_bytes(len(a), 'little')
+
+
+def _xor_into(dst, src, gamma):
+    # dst[k] = src[k] ^ gamma[k] кусками по _XOR_CHUNK
+    for start in range(0, len(src), _XOR_CHUNK):
+        end = min(start + _XOR_CHUNK, len(src))
+        dst[start:end] = _xor_bytes(src[start:end], gamma[start:end])
+
+
+def _prga(GEN, i, j, GAMMA, start, end):
+    # Заполнение GAMMA[start:end]; состояние -- в локальных переменных, возвращается новое (i, j)
+    for k in range(start, end):
+        i = (i + 1) & 255
+        gi = GEN[i]
+        j = (j + gi) & 255
+        gj = GEN[j]
+        GEN[i] = gj
+        GEN[j] = gi
+        GAMMA[k] = GEN[(gi + gj) & 255]
+    return i, j
+
+
+# Индекс контрольных точек: состояние генератора (GEN, i, j) через каждые interval байт гаммы
+class KeystreamCheckpoints:
+    _HEADER = struct.Struct('<4sQI')
+    _ENTRY = struct.Struct('<QBB')
+    _MAGIC = b'RC4I'
+
+    def __init__(self, interval):
+        if interval <= 0:
+            raise ValueError("Checkpoint interval must be positive")
+        self.interval = interval
+        self.positions = []
+        self.states = []
+
+    def add(self, position, GEN, i, j):
+        if self.positions and position <= self.positions[-1]:
+            return
+        self.positions.append(position)
+        self.states.append((bytes(GEN), i, j))
+
+    # Ближайшая контрольная точка не дальше offset: (позиция, GEN, i, j)
+    def nearest(self, offset):
+        index = bisect.bisect_right(self.positions, offset) - 1
+        if index < 0:
+            raise ValueError(f"No checkpoint at or before offset {offset}")
+        GEN, i, j = self.states[index]
+        return self.positions[index], list(GEN), i, j
+
+    def to_bytes(self):
+        parts = [self._HEADER.pack(self._MAGIC, self.interval, len(self.positions))]
+        for position, (GEN, i, j) in zip(self.positions, self.states):
+            parts.append(self._ENTRY.pack(position, i, j))
+            parts.append(GEN)
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, interval, count = cls._HEADER.unpack_from(data)
+        if magic != cls._MAGIC:
+            raise ValueError("Not a keystream checkpoint index")
+        index = cls(interval)
+        offset = cls._HEADER.size
+        for _ in range(count):
+            position, i, j = cls._ENTRY.unpack_from(data, offset)
+            offset += cls._ENTRY.size
+            index.positions.append(position)
+            index.states.append((bytes(data[offset:offset + 256]), i, j))
+            offset += 256
+        return index
+
 
 class StreamCipher:
     def __init__(self):
         self.KEY = []
         self.GEN = []
+        # Позиция генератора сохраняется между вызовами, чтобы шифровать поток по частям
+        self.i = 0
+        self.j = 0
+        self.position = 0  # Сколько байт гаммы выдано с момента init_generator
+        self.checkpoints = None
 
     def create_key(self):
         # 1. Создание ключа как перестановки чисел 0-255
@@ -17,32 +106,124 @@ class StreamCipher:
         for i in range(256):
             j = (j + self.GEN[i] + self.KEY[i]) % 256
             self.GEN[i], self.GEN[j] = self.GEN[j], self.GEN[i]
+        self.i = 0
+        self.j = 0
+        self.position = 0
+        self.checkpoints = None
 
-    def get_gamma(self, message_length):
-        # 3. Генерация гаммы GAMMA равной длине сообщения
-        GAMMA = [0] * message_length
-        i = 0
-        j = 0
-        for k in range(message_length):
-            i = (i + 1) % 256
-            j = (j + self.GEN[i]) % 256
-            self.GEN[i], self.GEN[j] = self.GEN[j], self.GEN[i]
-            t = (self.GEN[i] + self.GEN[j]) % 256
-            GAMMA[k] = self.GEN[t]
+    def enable_checkpoints(self, interval):
+        # Запись контрольных точек при шифровании; вызывать сразу после init_generator
+        self.checkpoints = KeystreamCheckpoints(interval)
+        self.checkpoints.add(self.position, self.GEN, self.i, self.j)
+        return self.checkpoints
+
+    def keystream(self, length):
+        # 3. Генерация гаммы сразу в bytearray
+        GAMMA = bytearray(length)
+        self._fill_keystream(GAMMA, length)
         return GAMMA
 
+    def _fill_keystream(self, GAMMA, length):
+        # Следующие length байт гаммы в GAMMA[:length] (bytearray или memoryview)
+        checkpoints = self.checkpoints
+        if checkpoints is None:
+            self.i, self.j = _prga(self.GEN, self.i, self.j, GAMMA, 0, length)
+            self.position += length
+            return
+        # С индексом гамма генерируется отрезками до очередной границы interval
+        done = 0
+        while done < length:
+            step = min(length - done, checkpoints.interval - self.position % checkpoints.interval)
+            self.i, self.j = _prga(self.GEN, self.i, self.j, GAMMA, done, done + step)
+            done += step
+            self.position += step
+            if self.position % checkpoints.interval == 0:
+                checkpoints.add(self.position, self.GEN, self.i, self.j)
+
+    def get_gamma(self, message_length):
+        # Гамма GAMMA равной длине сообщения
+        return list(self.keystream(message_length))
+
     def encrypt(self, message_bytes):
-        # 4. Шифрование: XOR с гаммой
-        GAMMA = self.get_gamma(len(message_bytes))
-        output = bytearray(len(message_bytes))
-        for k in range(len(message_bytes)):
-            output[k] = message_bytes[k] ^ GAMMA[k]
-        return output
+        # 4. Шифрование: XOR с гаммой кусками, через длинные целые, прямо в результат
+        result = bytearray(len(message_bytes))
+        self.encrypt_into(message_bytes, result)
+        return result
 
     def decrypt(self, ciphertext_bytes):
         # 5. Расшифрование: то же самое, XOR с гаммой (поскольку XOR обратим)
         return self.encrypt(ciphertext_bytes)
 
+    def encrypt_into(self, src, dst):
+        # Запись результата прямо в буфер вызывающего (bytearray, memoryview), без копий
+        # размера сообщения: гамма и XOR идут кусками по _XOR_CHUNK; src и dst могут совпадать
+        src = memoryview(src).cast('B')
+        dst = memoryview(dst).cast('B')
+        if len(dst) < len(src):
+            raise ValueError("Destination buffer is smaller than source")
+        GAMMA = bytearray(min(len(src), _XOR_CHUNK))
+        for start in range(0, len(src), _XOR_CHUNK):
+            end = min(start + _XOR_CHUNK, len(src))
+            self._fill_keystream(GAMMA, end - start)
+            _xor_into(dst[start:end], src[start:end], GAMMA)
+        return len(src)
+
+    def encrypt_stream(self, chunks):
+        # Потоковое шифрование: гамма продолжается от куска к куску
+        for chunk in chunks:
+            yield self.encrypt(chunk)
+
+    def encrypt_file(self, src_path, dst_path, chunk_size=1 << 16):
+        # Файл обрабатывается кусками в одном переиспользуемом буфере, память постоянна
+        buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
+        total = 0
+        with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+            while True:
+                size = src.readinto(buffer)
+                if not size:
+                    break
+                self.encrypt_into(view[:size], view[:size])
+                dst.write(view[:size])
+                total += size
+        return total
+
+    def decrypt_range(self, ciphertext, offset, length, checkpoints=None):
+        # Расшифрование ciphertext[offset:offset + length] от ближайшей контрольной точки:
+        # пропускается не больше interval байт гаммы, состояние самого объекта не меняется
+        checkpoints = checkpoints or self.checkpoints
+        if checkpoints is None:
+            raise ValueError("No checkpoint index available")
+        position, GEN, i, j = checkpoints.nearest(offset)
+        skip = bytearray(offset - position)
+        i, j = _prga(GEN, i, j, skip, 0, len(skip))
+        data = ciphertext[offset:offset + length]
+        GAMMA = bytearray(len(data))
+        _prga(GEN, i, j, GAMMA, 0, len(data))
+        _xor_into(GAMMA, data, GAMMA)
+        return GAMMA
+
+    decrypt_into = encrypt_into
+    decrypt_stream = encrypt_stream
+    decrypt_file = encrypt_file
+
+# Скорость шифрования (МБ/с) для сообщений разных размеров, от 1 КБ до 1 ГБ. Сообщение
+# проходит через encrypt_into кусками по _XOR_CHUNK в одном буфере: память не растет с размером
+def benchmark_stream(sizes=(1 << 10, 1 << 20, 1 << 24, 1 << 30)):
+    cipher = StreamCipher()
+    cipher.create_key()
+    result = []
+    for size in sizes:
+        data = os.urandom(min(size, _XOR_CHUNK))
+        buffer = bytearray(len(data))
+        cipher.init_generator()
+        start = time.perf_counter()
+        for offset in range(0, size, len(data)):
+            cipher.encrypt_into(data[:size - offset], buffer)
+        result.append((size, size / (1 << 20) / (time.perf_counter() - start)))
+    return result
+
+
 # Пример использования
 if __name__ == "__main__":
     cipher = StreamCipher()
@@ -66,3 +247,14 @@ if __name__ == "__main__":
     decrypted_bytes = cipher_dec.decrypt(ciphertext)
     decrypted_text = decrypted_bytes.decode('utf-8')
     print("Расшифрованный текст:", decrypted_text)
+
+    cipher_idx = StreamCipher()
+    cipher_idx.KEY = cipher.KEY
+    cipher_idx.init_generator()
+    index = cipher_idx.enable_checkpoints(16)
+    archive = cipher_idx.encrypt(message_bytes)
+    restored = KeystreamCheckpoints.from_bytes(index.to_bytes())
+    print("Фрагмент по контрольным точкам:", cipher_idx.decrypt_range(archive, 20, 10, restored).decode('utf-8'))
+
+    for size, speed in benchmark_stream((1 << 10, 1 << 20)):
+        print(f"{size} байт: {speed:.2f} МБ/с")
@@ -1,22 +1,21 @@
 
 
+import secrets
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from typing import Tuple, List
 
-# ---------------- Базовые процедуры ----------------
+from modular import egcd
 
-def egcd(a: int, b: int) -> Tuple[int, int, int]:
-    """
-    Расширенный алгоритм Евклида: возвращает (g, x, y) такие, что ax + by = g = gcd(a, b). 
-    """
-    if b == 0:
-        return (a, 1, 0)
-    g, x1, y1 = egcd(b, a % b)
-    return (g, y1, x1 - (a // b) * y1)
+# ---------------- Базовые процедуры ----------------
 
 def modinv(e: int, phi: int) -> int:
     """
     d такое, что (d * e) % phi == 1, используется для d ≡ e^{-1} (mod φ(n)) 
     """
+    # φ(n) секретно, поэтому без кэширующего mod_inverse
     g, x, _ = egcd(e, phi)
     if g != 1:
         raise ValueError("Обратного элемента не существует (e и φ(n) не взаимно просты)")
@@ -30,9 +29,139 @@ def gcd(a: int, b: int) -> int:
         a, b = b, a % b
     return a
 
+def is_probable_prime(n: int, rounds: int = 40) -> bool:
+    """
+    Тест Миллера -- Рабина со случайными основаниями
+    """
+    if n < 2:
+        return False
+    for p in (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37):
+        if n % p == 0:
+            return n == p
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    for _ in range(rounds):
+        x = pow(secrets.randbelow(n - 3) + 2, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+@lru_cache(maxsize=None)
+def small_primes(limit: int = 1 << 16) -> Tuple[int, ...]:
+    """
+    Простые до limit решетом Эратосфена (один раз на процесс)
+    """
+    sieve = bytearray([1]) * (limit + 1)
+    sieve[0:2] = b'\x00\x00'
+    for p in range(2, int(limit ** 0.5) + 1):
+        if sieve[p]:
+            sieve[p * p::p] = bytes(len(range(p * p, limit + 1, p)))
+    return tuple(i for i, flag in enumerate(sieve) if flag)
+
+def random_prime(bits: int, e: int | None = None, window: int = 4096, rounds: int = 20) -> int:
+    """
+    Случайное простое ровно из bits бит (два старших бита единичные, так что p * q имеет 2 * bits бит).
+    Кандидаты base + 2k, k < window, просеиваются по малым простым: для каждого простого
+    вычеркивается арифметическая прогрессия, затем оставшиеся проверяются Миллером -- Рабиным.
+    При заданном e отбрасываются p с gcd(e, p - 1) != 1
+    """
+    primes = small_primes()[1:]  # без 2: кандидаты нечетные
+    while True:
+        base = secrets.randbits(bits) | (3 << (bits - 2)) | 1
+        composite = bytearray(window)
+        for p in primes:
+            if p * p >= 1 << bits:
+                break
+            # base + 2k ≡ 0 (mod p)  =>  k ≡ -base * 2^{-1} (mod p)
+            k = (-base * ((p + 1) // 2)) % p
+            composite[k::p] = b'\x01' * len(range(k, window, p))
+        for k in range(window):
+            if composite[k]:
+                continue
+            candidate = base + 2 * k
+            if candidate.bit_length() != bits:
+                break
+            if e is not None and gcd(e, candidate - 1) != 1:
+                continue
+            if is_probable_prime(candidate, rounds):
+                return candidate
+
+# ---------------- Типы ключей ----------------
+
+class PublicKey:
+    """
+    Открытый ключ (e, n); распаковывается как кортеж: e, n = key
+    """
+    __slots__ = ('e', 'n')
+
+    def __init__(self, e: int, n: int):
+        self.e = e
+        self.n = n
+
+    def __iter__(self):
+        return iter((self.e, self.n))
+
+    def __eq__(self, other):
+        if not isinstance(other, (tuple, PublicKey, PrivateKey)):
+            return NotImplemented
+        return tuple(self) == tuple(other)
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        return f"PublicKey(e={self.e}, n={self.n})"
+
+class PrivateKey:
+    """
+    Закрытый ключ с параметрами для КТО: p, q, dp = d mod (p-1), dq = d mod (q-1), qinv = q^{-1} mod p.
+    Распаковывается как кортеж (d, n), поэтому подходит везде, где ожидается (d, n)
+    """
+    __slots__ = ('d', 'n', 'p', 'q', 'dp', 'dq', 'qinv')
+
+    def __init__(self, d: int, p: int, q: int):
+        self.d = d
+        self.n = p * q
+        self.p = p
+        self.q = q
+        self.dp = d % (p - 1)
+        self.dq = d % (q - 1)
+        self.qinv = pow(q, -1, p)  # p и q секретны -- не через кэш mod_inverse
+
+    def decrypt(self, c: int) -> int:
+        """
+        m ≡ c^d (mod n) через две экспоненты по модулям p и q и формулу Гарнера
+        """
+        m1 = pow(c, self.dp, self.p)
+        m2 = pow(c, self.dq, self.q)
+        h = self.qinv * (m1 - m2) % self.p
+        return m2 + h * self.q
+
+    def __iter__(self):
+        return iter((self.d, self.n))
+
+    def __eq__(self, other):
+        if not isinstance(other, (tuple, PublicKey, PrivateKey)):
+            return NotImplemented
+        return tuple(self) == tuple(other)
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        return f"PrivateKey(d={self.d}, n={self.n})"
+
 # ---------------- Генерация ключей ----------------
 
-def generate_keys(p: int, q: int, e: int | None = None) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+def generate_keys(p: int, q: int, e: int | None = None, crt: bool = False) -> Tuple[Tuple[int, int], Tuple[int, int]]:
     """
     Генерация ключей RSA:
       - n = p * q
@@ -40,6 +169,7 @@ def generate_keys(p: int, q: int, e: int | None = None) -> Tuple[Tuple[int, int]
       - выбрать e: 1 < e < φ(n), gcd(e, φ(n)) = 1
       - d = e^{-1} mod φ(n)
       - открыть: (e, n), закрыть: (d, n)
+    При crt=True возвращаются PublicKey и PrivateKey, сохраняющий p и q для расшифрования по КТО
     """
     if p == q:
         raise ValueError("p и q должны быть различными простыми")
@@ -52,10 +182,31 @@ def generate_keys(p: int, q: int, e: int | None = None) -> Tuple[Tuple[int, int]
         raise ValueError("e должно быть в (1, φ(n)) и взаимно просто с φ(n)")
 
     d = modinv(e, phi)
+    if crt:
+        return PublicKey(e, n), PrivateKey(d, p, q)
     public_key = (e, n)
     private_key = (d, n)
     return public_key, private_key
 
+def generate_large_keys(bits: int = 2048, e: int = 65537, processes: int | None = None) -> Tuple["PublicKey", "PrivateKey"]:
+    """
+    Генерация ключей RSA без заданных p и q: модуль n ровно из bits бит,
+    p из bits // 2 бит, q из bits - bits // 2 бит.
+    При processes >= 2 p и q ищутся одновременно в двух процессах; пул закрывается
+    после того, как обе задачи завершены, так что работающих процессов не остается
+    """
+    p_bits, q_bits = bits // 2, bits - bits // 2
+    while True:
+        if processes and processes >= 2:
+            with ProcessPoolExecutor(2) as pool:
+                p_future = pool.submit(random_prime, p_bits, e)
+                q_future = pool.submit(random_prime, q_bits, e)
+                p, q = p_future.result(), q_future.result()
+        else:
+            p, q = random_prime(p_bits, e), random_prime(q_bits, e)
+        if p != q:
+            return generate_keys(p, q, e, crt=True)
+
 # ---------------- Шифрование/расшифрование целых ----------------
 
 def encrypt_int(m: int, public_key: Tuple[int, int]) -> int:
@@ -74,6 +225,8 @@ def decrypt_int(c: int, private_key: Tuple[int, int]) -> int:
     d, n = private_key
     if not (1 <= c <= n - 1):
         raise ValueError("c должно быть в диапазоне [1, n-1]")
+    if isinstance(private_key, PrivateKey):
+        return private_key.decrypt(c)
     return pow(c, d, n)
 
 # ---------------- Работа со строками (покоординатно по символам) ----------------
@@ -96,12 +249,145 @@ def decrypt_text(cipher: List[int], private_key: Tuple[int, int]) -> str:
     Обратное преобразование: каждый элемент расшифровываем и превращаем в символ chr(m)
     """
     d, n = private_key
+    decrypt = private_key.decrypt if isinstance(private_key, PrivateKey) else lambda c: pow(c, d, n)
     chars = []
     for c in cipher:
-        m = pow(c, d, n)  # m = c^d mod n
+        m = decrypt(c)  # m = c^d mod n
         chars.append(chr(m))  # Восстанавливаем символ
     return "".join(chars)  # Собираем строку
 
+# ---------------- Массовое расшифрование посимвольных шифртекстов ----------------
+
+BULK_CACHE_SIZE = 1 << 16
+_bulk_cache: "OrderedDict[Tuple[int, int, int], int]" = OrderedDict()  # (n, d, c) -> m, LRU между вызовами
+
+def _key_args(private_key: Tuple[int, int]) -> tuple:
+    if isinstance(private_key, PrivateKey):
+        return (private_key.d, private_key.p, private_key.q)
+    return tuple(private_key)
+
+def _decrypt_chunk(key_args: tuple, chunk: List[int]) -> List[int]:
+    """
+    Расшифрование куска уникальных шифртекстов (выполняется и в дочерних процессах)
+    """
+    if len(key_args) == 3:
+        decrypt = PrivateKey(*key_args).decrypt
+    else:
+        d, n = key_args
+        decrypt = lambda c: pow(c, d, n)
+    return [decrypt(c) for c in chunk]
+
+def decrypt_text_bulk(cipher: List[int], private_key: Tuple[int, int], processes: int | None = None,
+                      chunk_size: int = 256) -> str:
+    """
+    То же, что decrypt_text, но каждое различное значение возводится в степень один раз:
+    результаты хранятся в ограниченном LRU-кэше между вызовами, а новые уникальные значения
+    при processes >= 2 расшифровываются пулом процессов кусками по chunk_size
+    """
+    d, n = private_key
+    plain = {}
+    missing = []
+    for c in dict.fromkeys(cipher):
+        key = (n, d, c)
+        if key in _bulk_cache:
+            _bulk_cache.move_to_end(key)
+            plain[c] = _bulk_cache[key]
+        else:
+            missing.append(c)
+    chunks = [missing[i:i + chunk_size] for i in range(0, len(missing), chunk_size)]
+    key_args = _key_args(private_key)
+    if processes and processes >= 2 and len(chunks) >= 2:
+        with ProcessPoolExecutor(processes) as pool:
+            results = list(pool.map(_decrypt_chunk, [key_args] * len(chunks), chunks))
+    else:
+        results = [_decrypt_chunk(key_args, chunk) for chunk in chunks]
+    for chunk, values in zip(chunks, results):
+        for c, m in zip(chunk, values):
+            plain[c] = m
+            _bulk_cache[(n, d, c)] = m
+    while len(_bulk_cache) > BULK_CACHE_SIZE:
+        _bulk_cache.popitem(last=False)
+    chars = {c: chr(m) for c, m in plain.items()}
+    return "".join(map(chars.__getitem__, cipher))
+
+# ---------------- Работа со строками (упакованными блоками) ----------------
+
+def _packed_sizes(n: int) -> Tuple[int, int]:
+    """
+    (байт открытого текста в блоке, байт шифрблока): блок открытого текста всегда меньше n
+    """
+    block = (n.bit_length() - 1) // 8
+    if block < 1:
+        raise ValueError("n слишком мало для блочного режима; выберите большие p, q")
+    return block, (n.bit_length() + 7) // 8
+
+def encrypt_text_packed(text: str, public_key: Tuple[int, int]) -> bytes:
+    """
+    Текст в UTF-8 с 8-байтовым префиксом длины режется на блоки максимального размера,
+    каждый блок шифруется одним pow; шифрблоки записываются подряд фиксированной ширины
+    """
+    e, n = public_key
+    block, width = _packed_sizes(n)
+    data = text.encode('utf-8')
+    data = len(data).to_bytes(8, 'big') + data
+    data += bytes(-len(data) % block)
+    out = bytearray()
+    for start in range(0, len(data), block):
+        m = int.from_bytes(data[start:start + block], 'big')
+        out += pow(m, e, n).to_bytes(width, 'big')
+    return bytes(out)
+
+def decrypt_text_packed(cipher: bytes, private_key: Tuple[int, int]) -> str:
+    """
+    Обратное преобразование к encrypt_text_packed
+    """
+    d, n = private_key
+    block, width = _packed_sizes(n)
+    if len(cipher) % width:
+        raise ValueError("Длина шифртекста не кратна размеру блока")
+    decrypt = private_key.decrypt if isinstance(private_key, PrivateKey) else lambda c: pow(c, d, n)
+    data = bytearray()
+    for start in range(0, len(cipher), width):
+        c = int.from_bytes(cipher[start:start + width], 'big')
+        if c >= n:
+            raise ValueError("Шифрблок должен быть меньше n; шифртекст поврежден или ключ не тот")
+        m = decrypt(c)
+        if m >> (8 * block):
+            raise ValueError("Расшифрованный блок не помещается в блок открытого текста; ключ не тот")
+        data += m.to_bytes(block, 'big')
+    length = int.from_bytes(data[:8], 'big')
+    return bytes(data[8:8 + length]).decode('utf-8')
+
+# ---------------- Замеры ----------------
+
+def benchmark_keygen(sizes: Tuple[int, ...] = (1024, 2048, 3072, 4096), processes: int | None = None) -> List[Tuple[int, float]]:
+    """
+    Время генерации ключа для каждого размера модуля
+    """
+    result = []
+    for bits in sizes:
+        start = time.perf_counter()
+        generate_large_keys(bits, processes=processes)
+        result.append((bits, time.perf_counter() - start))
+    return result
+
+def benchmark_crt(sizes: Tuple[int, ...] = (1024, 2048, 3072, 4096), count: int = 20) -> List[Tuple[int, float, float]]:
+    """
+    Время count расшифрований для ключа каждого размера: (биты n, через (d, n), через КТО)
+    """
+    result = []
+    for bits in sizes:
+        pub, priv = generate_large_keys(bits)
+        ciphers = [encrypt_int(secrets.randbelow(pub.n - 2) + 1, pub) for _ in range(count)]
+        start = time.perf_counter()
+        plain = [decrypt_int(c, (priv.d, priv.n)) for c in ciphers]
+        tuple_time = time.perf_counter() - start
+        start = time.perf_counter()
+        if [decrypt_int(c, priv) for c in ciphers] != plain:
+            raise AssertionError("CRT decryption mismatch")
+        result.append((bits, tuple_time, time.perf_counter() - start))
+    return result
+
 # ---------------- Демонстрация ----------------
 
 if __name__ == "__main__":
@@ -119,4 +405,15 @@ if __name__ == "__main__":
     text = "Закрытый ключ переломлен пополам, а наш батюшка сеньор, совсем усоп, он разложился на сессию и липовый прод"
     cipher_list = encrypt_text(text, pub)
     text_back = decrypt_text(cipher_list, priv)
-    print(f"text = {text!r}\ncipher = {cipher_list}\ntext' = {text_back!r}") 
+    print(f"text = {text!r}\ncipher = {cipher_list}\ntext' = {text_back!r}")
+
+    print(f"Массовое расшифрование совпадает: {decrypt_text_bulk(cipher_list * 100, priv) == text * 100}")
+
+    packed = encrypt_text_packed(text, pub)
+    print(f"Блочный режим: {len(packed)} байт шифртекста, text' = {decrypt_text_packed(packed, priv)!r}")
+
+    for bits, tuple_time, crt_time in benchmark_crt((1024, 2048)):
+        print(f"{bits} бит: (d, n) {tuple_time:.3f} с, КТО {crt_time:.3f} с (x{tuple_time / crt_time:.1f})")
+
+    for bits, seconds in benchmark_keygen((1024, 2048)):
+        print(f"Генерация ключа {bits} бит: {seconds:.2f} с")
@@ -1,5 +1,8 @@
 import random
 import math
+import time
+
+import numpy as np
 
 
 def calculate_hamming_params(alphabet_size):
@@ -102,6 +105,225 @@ def decode_hamming(received, n, k):
     return data_bits, error_position
 
 
+def _chunk_tables(width, value_of_bit, chunk_bits=8):
+    """
+    Таблицы для линейного по XOR отображения слова из width бит: для каждого куска
+    из chunk_bits бит -- 2^chunk_bits готовых значений. value_of_bit(b) -- образ слова,
+    в котором установлен только бит b. Возвращает список (сдвиг, таблица).
+    """
+    tables = []
+    size = 1 << chunk_bits
+    for shift in range(0, width, chunk_bits):
+        table = [0] * size
+        for value in range(1, size):
+            low = value & -value
+            bit = shift + low.bit_length() - 1
+            table[value] = table[value ^ low] ^ (value_of_bit(bit) if bit < width else 0)
+        tables.append((shift, table))
+    return tables
+
+
+class HammingCodec:
+    """
+    Табличный кодек Хэмминга для заданных (n, k); кодовое слово -- одно целое число.
+    Позиция i (1-indexed, как в encode_hamming) -- бит 1 << (n - i), так что
+    format(word, f'0{n}b') совпадает со списком битов encode_hamming.
+    Информационное слово -- целое из m бит, старший бит -- первый информационный.
+    Для n <= FULL_TABLE_BITS используются полные таблицы (одна выборка на символ),
+    для больших n -- таблицы по кускам из CHUNK_BITS бит. Пакетные encode_many/decode_many
+    при n <= NUMPY_MAX_BITS делают выборки по тем же таблицам в numpy и возвращают массивы.
+    """
+
+    FULL_TABLE_BITS = 16
+    CHUNK_BITS = 16
+    NUMPY_MAX_BITS = 63  # кодовое слово помещается в int64
+
+    def __init__(self, n, k):
+        self.n = n
+        self.k = k
+        self.parity_positions = get_parity_bit_positions(n)
+        parity_set = set(self.parity_positions)
+        self.data_positions = [i for i in range(1, n + 1) if i not in parity_set]
+        self.m = len(self.data_positions)
+
+        # Маска каждого контрольного бита: позиции, которые он контролирует
+        self.parity_masks = []
+        for parity_pos in self.parity_positions:
+            mask = 0
+            for i in range(1, n + 1):
+                if i & parity_pos:
+                    mask |= 1 << (n - i)
+            self.parity_masks.append((1 << (n - parity_pos), mask))
+
+        m = self.m
+        data_index = {pos: m - 1 - idx for idx, pos in enumerate(self.data_positions)}
+
+        # Кодирование линейно, поэтому таблицы строятся через маски и popcount
+        def encode_bit(bit):
+            word = 1 << (n - self.data_positions[m - 1 - bit])
+            for parity_bit, mask in self.parity_masks:
+                if (word & mask).bit_count() & 1:
+                    word |= parity_bit
+            return word
+
+        # Синдром (XOR номеров позиций единичных битов) и информационные биты тоже линейны:
+        # одна таблица дает оба сразу как (синдром << m) | данные
+        def decode_bit(bit):
+            pos = n - bit
+            return (pos << m) | (1 << data_index[pos] if pos in data_index else 0)
+
+        self._chunk_bits = chunk_bits = min(self.CHUNK_BITS, n)
+        self._full_tables = n <= self.FULL_TABLE_BITS
+        self._encode_tables = _chunk_tables(m, encode_bit, chunk_bits)
+        self._decode_tables = _chunk_tables(n, decode_bit, chunk_bits)
+        self._data_mask = (1 << m) - 1
+        # Синдром -> исправление информационных битов (синдром вне [1, n] не исправляется)
+        self._error_data = [1 << data_index[s] if s in data_index else 0
+                            for s in range(1 << len(self.parity_positions))]
+
+        self._encode = self._encode_chunked
+        self._decode = self._decode_chunked
+        if self._full_tables:
+            self._encode = self._encode_tables[0][1][:1 << m].__getitem__
+            self._decode = [self._decode_chunked(word) for word in range(1 << n)].__getitem__
+
+        # Таблицы numpy: при полных таблицах -- готовые данные и синдром на каждое слово,
+        # иначе -- куски, как в _encode_chunked/_decode_chunked
+        self._np_tables = None
+        if n <= self.NUMPY_MAX_BITS:
+            self._np_tables = tuple(
+                [(np.int64(shift), np.array(table, dtype=np.int64)) for shift, table in tables]
+                for tables in (self._encode_tables, self._decode_tables))
+            self._np_error_data = np.array(self._error_data, dtype=np.int64)
+            if self._full_tables:
+                packed = self._np_tables[1][0][1]
+                self._np_syndromes = packed >> m
+                self._np_data = (packed & self._data_mask) ^ self._np_error_data[self._np_syndromes]
+
+    def _encode_chunked(self, data):
+        word = 0
+        chunk_mask = (1 << self._chunk_bits) - 1
+        for shift, table in self._encode_tables:
+            word ^= table[(data >> shift) & chunk_mask]
+        return word
+
+    def _decode_chunked(self, word):
+        packed = 0
+        chunk_mask = (1 << self._chunk_bits) - 1
+        for shift, table in self._decode_tables:
+            packed ^= table[(word >> shift) & chunk_mask]
+        syndrome = packed >> self.m
+        return (packed & self._data_mask) ^ self._error_data[syndrome], syndrome
+
+    def _lookup_np(self, tables, values):
+        if len(tables) == 1:
+            return tables[0][1].take(values)
+        chunk_mask = np.int64((1 << self._chunk_bits) - 1)
+        result = np.zeros(len(values), dtype=np.int64)
+        for shift, table in tables:
+            result ^= table.take((values >> shift) & chunk_mask)
+        return result
+
+    def _check(self, values, width):
+        if len(values) and (min(values) < 0 or max(values) >> width):
+            raise ValueError(f"Values must be in [0, 2^{width})")
+
+    def _to_array(self, values, width):
+        if not isinstance(values, np.ndarray):
+            values = list(values)
+        try:
+            values = np.asarray(values, dtype=np.int64)
+        except OverflowError:
+            raise ValueError(f"Values must be in [0, 2^{width})") from None
+        if values.size and (values.min() < 0 or values.max() >> width):
+            raise ValueError(f"Values must be in [0, 2^{width})")
+        return values
+
+    def encode(self, data):
+        self._check((data,), self.m)
+        return self._encode(data)
+
+    def syndrome(self, word):
+        return self.decode(word)[1]
+
+    def decode(self, word):
+        """
+        Возвращает (информационное слово, позиция ошибки или 0), как decode_hamming
+        """
+        self._check((word,), self.n)
+        return self._decode(word)
+
+    def encode_many(self, data_words):
+        """
+        Кодовые слова для последовательности информационных слов; массив numpy
+        """
+        if self._np_tables is None:
+            data_words = list(data_words)
+            self._check(data_words, self.m)
+            return np.array(list(map(self._encode, data_words)), dtype=object)
+        return self._lookup_np(self._np_tables[0], self._to_array(data_words, self.m))
+
+    def decode_many(self, words):
+        """
+        Возвращает два массива numpy: информационные слова и позиции ошибок (0 -- без ошибки)
+        """
+        if self._np_tables is None:
+            words = list(words)
+            self._check(words, self.n)
+            decoded = list(map(self._decode, words))
+            return (np.array([data for data, _ in decoded], dtype=object),
+                    np.array([syndrome for _, syndrome in decoded], dtype=object))
+        words = self._to_array(words, self.n)
+        if self._full_tables:
+            return self._np_data.take(words), self._np_syndromes.take(words)
+        packed = self._lookup_np(self._np_tables[1], words)
+        syndromes = packed >> self.m
+        return (packed & self._data_mask) ^ self._np_error_data.take(syndromes), syndromes
+
+    # Совместимость со списками битов encode_hamming/decode_hamming
+    def encode_bits(self, data_bits):
+        return int_to_bits(self.encode(bits_to_int(data_bits[:self.m])), self.n)
+
+    def decode_bits(self, received):
+        data, error_position = self.decode(bits_to_int(received))
+        return int_to_bits(data, self.m), error_position
+
+
+def bits_to_int(bits):
+    value = 0
+    for bit in bits:
+        value = (value << 1) | bit
+    return value
+
+
+def int_to_bits(value, width):
+    return [(value >> (width - 1 - i)) & 1 for i in range(width)]
+
+
+def benchmark_hamming(count=100000, n=15, k=4):
+    """
+    Время на символ (кодирование + декодирование с одной ошибкой): списки против таблиц.
+    """
+    codec = HammingCodec(n, k)
+    words = [random.getrandbits(codec.m) for _ in range(count)]
+    errors = [random.randint(1, n) for _ in range(count)]
+    bit_words = [int_to_bits(w, codec.m) for w in words]
+    flips = [1 << (n - err) for err in errors]
+    flip_array = np.array(flips, dtype=np.int64) if n <= HammingCodec.NUMPY_MAX_BITS else np.array(flips, dtype=object)
+
+    start = time.perf_counter()
+    for bits, err in zip(bit_words, errors):
+        encoded = encode_hamming(bits, n, k)
+        encoded[err - 1] ^= 1
+        decode_hamming(encoded, n, k)
+    list_time = (time.perf_counter() - start) / count
+
+    start = time.perf_counter()
+    codec.decode_many(codec.encode_many(words) ^ flip_array)
+    table_time = (time.perf_counter() - start) / count
+    return list_time, table_time
+
+
 def introduce_error(encoded_list, symbol_index, bit_position):
     """
     Вносит ошибку в закодированное сообщение.
@@ -212,6 +434,11 @@ def main():
         print("✓ Сообщение успешно восстановлено!")
     else:
         print("✗ Ошибка при восстановлении сообщения")
+    print()
+
+    list_time, table_time = benchmark_hamming(n=n, k=k)
+    print(f"На символ: списки {list_time * 1e6:.2f} мкс, таблицы {table_time * 1e6:.3f} мкс "
+          f"(ускорение x{list_time / table_time:.0f})")
 
 
 if __name__ == "__main__":
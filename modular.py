@@ -0,0 +1,50 @@
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+
+# ---------------- Общая модульная арифметика для lab3 и lab7 ----------------
+
+def egcd(a: int, b: int) -> Tuple[int, int, int]:
+    """
+    Расширенный алгоритм Евклида без рекурсии: возвращает (g, x, y) такие, что ax + by = g = gcd(a, b).
+    """
+    x0, y0, x1, y1 = 1, 0, 0, 1
+    while b:
+        q, r = divmod(a, b)
+        a, b = b, r
+        x0, x1 = x1, x0 - q * x1
+        y0, y1 = y1, y0 - q * y1
+    return a, x0, y0
+
+@lru_cache(maxsize=4096)
+def mod_inverse(a: int, m: int) -> int:
+    """
+    a^{-1} mod m; результат кэшируется, т.к. одни и те же ключи обращаются многократно.
+    """
+    g, x, _ = egcd(a % m, m)
+    if g != 1:
+        raise ValueError(f"No modular inverse for {a} mod {m}")
+    return x % m
+
+def batch_mod_inverse(values: Sequence[int], m: int) -> List[int]:
+    """
+    Обратные ко всем values по модулю m трюком Монтгомери: одно обращение и 3(n-1) умножений.
+    """
+    if not values:
+        return []
+    prefix = [0] * len(values)
+    acc = 1
+    for i, v in enumerate(values):
+        acc = acc * v % m
+        prefix[i] = acc
+    try:
+        inv = mod_inverse(acc, m)
+    except ValueError:
+        # Произведение необратимо -- значит, необратим хотя бы один из множителей
+        bad = next(v for v in values if egcd(v % m, m)[0] != 1)
+        raise ValueError(f"No modular inverse for {bad} mod {m}") from None
+    result = [0] * len(values)
+    for i in range(len(values) - 1, 0, -1):
+        result[i] = inv * prefix[i - 1] % m
+        inv = inv * values[i] % m
+    result[0] = inv
+    return result